@@ -0,0 +1,95 @@
+import hashlib
+import json
+import re
+from typing import Optional
+
+from . import config
+
+DEFAULT_ACCOUNT = "default"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,40}$")
+
+
+class Account:
+    """One HiPass login plus card selection (ecd_no).
+
+    Each account has its own receipt directory and is captured in its own browser
+    context. The default account keeps the original single-account layout at the
+    top of SCREENSHOTS_DIR; the others live under SCREENSHOTS_DIR/accounts/<name>/.
+    Accounts sharing a login also share its saved session, so capturing several
+    cards of one login does not log in once per card."""
+
+    def __init__(self, name: str, user_id: str, password: str, ecd_no: str = ""):
+        if not _NAME_RE.match(name):
+            raise ValueError(f"invalid account name {name!r} (letters, digits, '-', '_')")
+        self.name = name
+        self.user_id = user_id
+        self.password = password
+        self.ecd_no = ecd_no
+        if name == DEFAULT_ACCOUNT:
+            self.directory = config.SCREENSHOTS_DIR
+            self.url_prefix = ""
+        else:
+            self.directory = config.SCREENSHOTS_DIR / "accounts" / name
+            self.url_prefix = f"accounts/{name}/"
+        self.staging_dir = self.directory / "staging"
+        if user_id == config.HIPASS_ID:
+            self.session_file = config.SCREENSHOTS_DIR / "session_state.json"
+        else:
+            login_key = hashlib.sha256(user_id.encode()).hexdigest()[:12]
+            self.session_file = config.SCREENSHOTS_DIR / "sessions" / f"{login_key}.json"
+
+    def __repr__(self) -> str:
+        # Never include the password
+        return f"Account({self.name!r}, ecd_no={self.ecd_no!r})"
+
+    def public(self) -> dict:
+        return {"name": self.name, "ecd_no": self.ecd_no}
+
+
+def _load() -> dict[str, Account]:
+    """HIPASS_ACCOUNTS (JSON list) if set, else one default account from HIPASS_ID/PW/ECD_NO.
+
+    Entry: {"name": "truck-1", "id": "...", "pw": "...", "ecd_no": "0001"}.
+    "ecd_no" may be a list — one account per card, named "<name>-<ecd_no>"."""
+    raw = config.HIPASS_ACCOUNTS.strip()
+    if not raw:
+        return {DEFAULT_ACCOUNT: Account(DEFAULT_ACCOUNT, config.HIPASS_ID, config.HIPASS_PW, config.ECD_NO)}
+
+    loaded: dict[str, Account] = {}
+    for item in json.loads(raw):
+        cards = item.get("ecd_no", "")
+        if isinstance(cards, list):
+            pairs = [(f"{item['name']}-{card}", card) for card in cards]
+        else:
+            pairs = [(item["name"], cards)]
+        for name, card in pairs:
+            if name in loaded:
+                raise ValueError(f"duplicate account name {name!r} in HIPASS_ACCOUNTS")
+            loaded[name] = Account(name, item["id"], item["pw"], card)
+    if not loaded:
+        raise ValueError("HIPASS_ACCOUNTS is empty")
+    return loaded
+
+
+_accounts = _load()
+
+
+def ensure_dirs() -> None:
+    """Create SCREENSHOTS_DIR and every account's receipt and session directories
+    (blocking). Called at startup and before a capture, not at import."""
+    config.SCREENSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    for account in _accounts.values():
+        account.directory.mkdir(parents=True, exist_ok=True)
+        account.session_file.parent.mkdir(parents=True, exist_ok=True)
+
+
+def all_accounts() -> list[Account]:
+    return list(_accounts.values())
+
+
+def get(name: Optional[str] = None) -> Account:
+    """Account by name; None selects the first configured one. KeyError if unknown."""
+    if name is None:
+        return next(iter(_accounts.values()))
+    return _accounts[name]
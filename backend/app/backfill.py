@@ -0,0 +1,143 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+from . import config, diskio, events
+from .jobs import coordinator
+from .store import store
+
+# Capture outcomes that settle a date for good; anything else is retried
+_SETTLED = {"success", "empty", "skipped", "updated", "unchanged"}
+
+
+class BackfillRunner:
+    """Captures an arbitrary date range in small chunks, checkpointing every date.
+
+    Each backfill is a row in the store plus one checkpoint row per date. A runner
+    task feeds BACKFILL_CHUNK_DAYS pending dates at a time through the capture
+    coordinator — so chunks queue fairly with scheduled and manual jobs and reuse
+    the scraper's retry, re-login and circuit breaker — then marks each date done
+    or failed. Memory stays flat whatever the range: only one chunk is in flight.
+
+    Progress survives restarts: running backfills are resumed at startup and pick
+    up from their first unfinished date. Between chunks the runner sleeps as needed
+    to stay within BACKFILL_RPM lookups per minute."""
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def start(self, account: str, start: date, end: date, force: bool = False) -> tuple[dict, bool]:
+        """Create and start a backfill of start..end; returns (backfill, created).
+        An identical backfill that is still running is returned instead of a new one."""
+        running = await diskio.run_io(store.list_backfills, account=account, state="running")
+        for existing in running:
+            if (existing["from"], existing["to"], existing["force"]) == (start.isoformat(), end.isoformat(), force):
+                return existing, False
+
+        backfill_id = str(uuid.uuid4())
+        dates = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        backfill = await diskio.run_io(
+            store.create_backfill, backfill_id, account, start.isoformat(), end.isoformat(), force, dates
+        )
+        self._spawn(backfill_id)
+        print(f"[backfill] {backfill_id}: {account} {start}~{end} ({len(dates)} date(s)) started")
+        return backfill, True
+
+    async def resume_all(self) -> None:
+        """Restart the backfills a previous process left running."""
+        for backfill in await diskio.run_io(store.list_backfills, state="running"):
+            print(f"[backfill] {backfill['backfill_id']}: resuming ({backfill['done']}/{backfill['total']} done)")
+            self._spawn(backfill["backfill_id"])
+
+    async def pause(self, backfill_id: str) -> None:
+        await diskio.run_io(store.set_backfill_state, backfill_id, "paused")
+        self._cancel(backfill_id)
+
+    async def resume(self, backfill_id: str) -> None:
+        await diskio.run_io(store.set_backfill_state, backfill_id, "running")
+        self._spawn(backfill_id)
+
+    async def delete(self, backfill_id: str) -> bool:
+        self._cancel(backfill_id)
+        return await diskio.run_io(store.delete_backfill, backfill_id)
+
+    async def stop(self) -> None:
+        # State stays "running" so the next process resumes them
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _spawn(self, backfill_id: str) -> None:
+        if backfill_id not in self._tasks:
+            self._tasks[backfill_id] = asyncio.create_task(self._run(backfill_id))
+
+    def _cancel(self, backfill_id: str) -> None:
+        task = self._tasks.get(backfill_id)
+        if task is not None:
+            # A chunk already handed to the coordinator still finishes; its dates are
+            # checkpointed again when the backfill resumes (and skipped if captured)
+            task.cancel()
+
+    async def _run(self, backfill_id: str) -> None:
+        try:
+            await self._run_chunks(backfill_id)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[backfill] {backfill_id}: stopped: {e}")
+        finally:
+            self._tasks.pop(backfill_id, None)
+
+    async def _run_chunks(self, backfill_id: str) -> None:
+        backfill = await diskio.run_io(store.get_backfill, backfill_id)
+        if backfill is None:
+            return
+        loop = asyncio.get_running_loop()
+        seconds_per_lookup = 60 / config.BACKFILL_RPM if config.BACKFILL_RPM > 0 else 0.0
+
+        while True:
+            chunk = await diskio.run_io(
+                store.next_backfill_dates, backfill_id,
+                max(1, config.BACKFILL_CHUNK_DAYS), max(1, config.BACKFILL_MAX_ATTEMPTS),
+            )
+            if not chunk:
+                break
+            started = loop.time()
+            job_id = await coordinator.run(
+                "backfill", [date.fromisoformat(d) for d in chunk],
+                force=backfill["force"], account=backfill["account"],
+            )
+            outcomes = await diskio.run_io(_chunk_outcomes, job_id, chunk)
+            await diskio.run_io(store.mark_backfill_dates, backfill_id, outcomes, job_id)
+
+            progress = await diskio.run_io(store.get_backfill, backfill_id)
+            events.hub.publish(backfill_id, {"type": "progress", **progress})
+            print(f"[backfill] {backfill_id}: {progress['done']}/{progress['total']} done, {progress['error']} failed")
+
+            # Spread the chunk's lookups over the per-minute budget
+            remaining = len(chunk) * seconds_per_lookup - (loop.time() - started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+        await diskio.run_io(store.set_backfill_state, backfill_id, "done")
+        finished = await diskio.run_io(store.get_backfill, backfill_id)
+        events.hub.publish(backfill_id, {"type": "finished", **finished})
+        print(f"[backfill] {backfill_id}: finished ({finished['done']} done, {finished['error']} failed)")
+
+
+def _chunk_outcomes(job_id: str, chunk: list[str]) -> dict[str, str]:
+    """'done' / 'error' per date of a chunk, from the capture log of its job. A date
+    without an entry (e.g. the job could not log in) counts as a failed attempt."""
+    _, entries = store.list_captures(limit=len(chunk) * 2 + 10, job_id=job_id)
+    latest: dict[str, str] = {}
+    for entry in entries:  # newest first
+        latest.setdefault(entry["date"], entry["status"])
+    return {d: "done" if latest.get(d) in _SETTLED else "error" for d in chunk}
+
+
+def in_backfill(date_str: str, ranges: list[tuple[str, str]]) -> bool:
+    return any(start <= date_str <= end for start, end in ranges)
+
+
+runner = BackfillRunner()
@@ -0,0 +1,91 @@
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
+
+from . import config, metrics
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Request, Route
+
+
+def _host_matches(host: str, domains: list[str]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourceBlocker:
+    """Aborts requests the scraper never needs, per BrowserContext.
+
+    Rules, in order:
+      1. any request to a deny-listed domain (analytics, ads) is aborted;
+      2. stylesheets are always allowed — `.popup_content` screenshots need them;
+      3. resource types in `block_types` are aborted everywhere;
+      4. resource types in `third_party_types` are aborted unless the host is allow-listed.
+    """
+
+    def __init__(
+        self,
+        block_types: list[str],
+        third_party_types: list[str],
+        allow_domains: list[str],
+        deny_domains: list[str],
+    ):
+        self.block_types = set(block_types)
+        self.third_party_types = set(third_party_types)
+        self.allow_domains = allow_domains
+        self.deny_domains = deny_domains
+
+    def should_block(self, resource_type: str, url: str) -> Optional[str]:
+        """Return the reason to block (used as a metric label), or None to allow."""
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            return None  # data:, blob: and the like never hit the network
+        if _host_matches(host, self.deny_domains):
+            return "deny_domain"
+        if resource_type == "stylesheet":
+            return None
+        if resource_type in self.block_types:
+            return "resource_type"
+        if resource_type in self.third_party_types and not _host_matches(host, self.allow_domains):
+            return "third_party"
+        return None
+
+    async def _handle(self, route: "Route") -> None:
+        request = route.request
+        reason = self.should_block(request.resource_type, request.url)
+        if reason is None:
+            await route.continue_()
+            return
+        metrics.BLOCKED_REQUESTS.labels(request.resource_type, reason).inc()
+        await route.abort("blockedbyclient")
+
+    async def _on_request_finished(self, request: "Request") -> None:
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        metrics.TRANSFERRED_BYTES.labels(request.resource_type).inc(
+            sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        )
+
+    async def install(self, context: "BrowserContext") -> None:
+        await context.route("**/*", self._handle)
+        context.on("requestfinished", self._on_request_finished)
+
+
+def _split(value: str) -> list[str]:
+    return [v.strip().lower() for v in value.split(",") if v.strip()]
+
+
+blocker = ResourceBlocker(
+    block_types=_split(config.BLOCK_RESOURCE_TYPES),
+    third_party_types=_split(config.BLOCK_THIRD_PARTY_TYPES),
+    allow_domains=_split(config.BLOCK_ALLOW_DOMAINS),
+    deny_domains=_split(config.BLOCK_DENY_DOMAINS),
+)
+
+
+async def install(context: "BrowserContext") -> None:
+    """Attach request blocking (if enabled) and transfer accounting to a new context."""
+    if config.BLOCK_RESOURCES:
+        await blocker.install(context)
+    else:
+        context.on("requestfinished", blocker._on_request_finished)
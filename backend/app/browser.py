@@ -0,0 +1,175 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from . import config
+from .metrics import BROWSER_LAUNCHES, process_tree_rss_mb
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Playwright
+
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-features=TranslateUI",
+]
+
+
+class BrowserPool:
+    """Keeps one headless Chromium warm and hands out isolated BrowserContexts.
+
+    The browser is recycled once it has served `max_jobs` contexts or the process
+    tree grows past `max_rss_mb`; recycling waits until no context is in use.
+
+    Between the daily runs the service mostly idles: once no context has been in use
+    for `idle_seconds`, Chromium and the Playwright driver are shut down and the next
+    context() launches them again (0 keeps them running). Playwright itself is only
+    imported on the first launch."""
+
+    def __init__(self, max_jobs: int, max_rss_mb: int, idle_seconds: float = 0):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.idle_seconds = idle_seconds
+        self._playwright: Optional["Playwright"] = None
+        self._browser: Optional["Browser"] = None
+        self._idle_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._active = 0
+        self._jobs_served = 0
+        self._launches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self) -> None:
+        async with self._lock:
+            try:
+                await self._ensure_browser()
+            finally:
+                self._schedule_idle_stop()
+
+    async def stop(self) -> None:
+        self._cancel_idle_stop()
+        async with self._lock:
+            await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        await self._close_browser()
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def _schedule_idle_stop(self) -> None:
+        self._cancel_idle_stop()
+        if self.idle_seconds > 0 and self._active == 0:
+            self._idle_task = asyncio.create_task(self._stop_when_idle())
+
+    def _cancel_idle_stop(self) -> None:
+        # Never cancel the timer from inside itself (it holds the lock while stopping)
+        if self._idle_task is not None and self._idle_task is not asyncio.current_task():
+            self._idle_task.cancel()
+        self._idle_task = None
+
+    async def _stop_when_idle(self) -> None:
+        await asyncio.sleep(self.idle_seconds)
+        async with self._lock:
+            if self._active or self._playwright is None:
+                return
+            print(
+                f"[browser] idle for {self.idle_seconds:.0f}s — shutting down "
+                f"(rss={process_tree_rss_mb():.0f} MB)"
+            )
+            await self._shutdown()
+            self._idle_task = None
+
+    async def _ensure_browser(self) -> "Browser":
+        if self.running:
+            return self._browser
+        # Crashed/disconnected browser — drop it before relaunching
+        await self._close_browser()
+        if self._playwright is None:
+            # Imported on first use: a service that is only serving receipts never
+            # loads Playwright at all
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=True, args=CHROMIUM_ARGS
+        )
+        self._jobs_served = 0
+        self._launches += 1
+        BROWSER_LAUNCHES.inc()
+        print(f"[browser] chromium launched (launch #{self._launches})")
+        return self._browser
+
+    async def _close_browser(self) -> None:
+        if self._browser is None:
+            return
+        try:
+            await self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+        print("[browser] chromium closed")
+
+    def _needs_recycle(self) -> bool:
+        if self._jobs_served >= self.max_jobs:
+            return True
+        return self.max_rss_mb > 0 and process_tree_rss_mb() >= self.max_rss_mb
+
+    @asynccontextmanager
+    async def context(self, **kwargs) -> AsyncIterator["BrowserContext"]:
+        """Yield a fresh BrowserContext on the shared browser; closed on exit."""
+        async with self._lock:
+            self._cancel_idle_stop()
+            try:
+                browser = await self._ensure_browser()
+            except Exception:
+                # A failed launch may still have started the driver
+                self._schedule_idle_stop()
+                raise
+            ctx = await browser.new_context(**kwargs)
+            self._active += 1
+            self._jobs_served += 1
+        try:
+            yield ctx
+        finally:
+            try:
+                await ctx.close()
+            except Exception:
+                pass
+            async with self._lock:
+                self._active -= 1
+                if self._active == 0 and self.running and self._needs_recycle():
+                    print(
+                        f"[browser] recycling after {self._jobs_served} jobs "
+                        f"(rss={process_tree_rss_mb():.0f} MB)"
+                    )
+                    await self._close_browser()
+                if self._active == 0:
+                    self._schedule_idle_stop()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "active_contexts": self._active,
+            "jobs_served": self._jobs_served,
+            "launches": self._launches,
+            "idle_seconds": self.idle_seconds,
+        }
+
+
+pool = BrowserPool(
+    max_jobs=config.BROWSER_MAX_JOBS,
+    max_rss_mb=config.BROWSER_MAX_RSS_MB,
+    idle_seconds=config.BROWSER_IDLE_SECONDS,
+)
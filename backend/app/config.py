@@ -14,13 +14,116 @@ def _get(key: str, default: str = "") -> str:
     # Prefer the dotenv-parsed value; fall back to os.environ (e.g. local dev)
     return _env.get(key) or os.environ.get(key, default)
 
+def _get_bool(key: str, default: bool = False) -> bool:
+    return _get(key, "true" if default else "false").strip().lower() in ("1", "true", "yes", "on")
+
 HIPASS_ID: str = _get("HIPASS_ID")
 HIPASS_PW: str = _get("HIPASS_PW")
 ECD_NO: str = _get("ECD_NO")
+# Several accounts/cards in one instance: JSON list, see app/accounts.py. When set,
+# HIPASS_ID/HIPASS_PW/ECD_NO are ignored.
+HIPASS_ACCOUNTS: str = _get("HIPASS_ACCOUNTS")
+# Overridden only to point the scraper at a stand-in site (see bench/mock_site.py)
+HIPASS_BASE_URL: str = _get("HIPASS_BASE_URL", "https://www.hipass.co.kr").rstrip("/")
 
 SCREENSHOTS_DIR: Path = Path(_get("SCREENSHOTS_DIR", "/app/screenshots"))
-SCREENSHOTS_DIR.mkdir(parents=True, exist_ok=True)
 
 RETENTION_DAYS: int = int(_get("RETENTION_DAYS", "14"))
 SCHEDULE_HOUR: int = int(_get("SCHEDULE_HOUR", "6"))
+# The scheduled job re-captures the most recent K already-captured days to pick up
+# late-posted transactions; the stored receipt is replaced only if it changed (0 = off)
+RECHECK_DAYS: int = int(_get("RECHECK_DAYS", "3"))
+# Days without a receipt are looked up again by the daily job only while they are at
+# most this many days old; a run that finds recent empty days re-checks them once more
+# after EMPTY_FOLLOWUP_HOURS (0 = no follow-up)
+EMPTY_RECHECK_DAYS: int = int(_get("EMPTY_RECHECK_DAYS", "3"))
+EMPTY_FOLLOWUP_HOURS: float = float(_get("EMPTY_FOLLOWUP_HOURS", "6"))
+# Minimum spacing between lookups across all capture workers (seconds)
 CAPTURE_COOLDOWN: float = float(_get("CAPTURE_COOLDOWN", "2.0"))
+# Number of pages capturing dates in parallel within one logged-in context
+CAPTURE_CONCURRENCY: int = int(_get("CAPTURE_CONCURRENCY", "2"))
+# Capture jobs allowed to run at once; further jobs wait in the queue
+JOB_CONCURRENCY: int = int(_get("JOB_CONCURRENCY", "1"))
+# Range mode: one lookup over the whole window finds the days with transactions,
+# so receipt popups are only opened for those days
+CAPTURE_RANGE_MODE: bool = _get_bool("CAPTURE_RANGE_MODE")
+RANGE_LOOKUP_MAX_DAYS: int = int(_get("RANGE_LOOKUP_MAX_DAYS", "31"))
+# Fast path: after the browser login, look days up with plain HTTP requests on the
+# context's cookies and open the browser lookup/popup only for days with transactions
+HTTP_FAST_PATH: bool = _get_bool("HTTP_FAST_PATH")
+
+# Shared Chromium: relaunched after this many jobs or once the process tree exceeds this RSS
+BROWSER_MAX_JOBS: int = int(_get("BROWSER_MAX_JOBS", "20"))
+BROWSER_MAX_RSS_MB: int = int(_get("BROWSER_MAX_RSS_MB", "700"))
+# Shut Chromium and the Playwright driver down after this many seconds without a job
+# (0 = keep running); launch it at startup so the first capture skips the cold start
+BROWSER_IDLE_SECONDS: float = float(_get("BROWSER_IDLE_SECONDS", "600"))
+BROWSER_WARMUP: bool = _get_bool("BROWSER_WARMUP", True)
+
+# HTML and API JSON responses at least this large are gzip-compressed
+GZIP_MIN_SIZE: int = int(_get("GZIP_MIN_SIZE", "500"))
+
+# Follow external changes to SCREENSHOTS_DIR (inotify) to keep the receipt manifest current
+MANIFEST_WATCH: bool = _get_bool("MANIFEST_WATCH", True)
+
+# Request blocking inside scraper contexts (see app/blocking.py); stylesheets are never blocked
+BLOCK_RESOURCES: bool = _get_bool("BLOCK_RESOURCES", True)
+# Resource types aborted on every host
+BLOCK_RESOURCE_TYPES: str = _get("BLOCK_RESOURCE_TYPES", "media")
+# Resource types aborted unless the host is in BLOCK_ALLOW_DOMAINS (web fonts/images on the
+# site itself stay, so receipts render as before)
+BLOCK_THIRD_PARTY_TYPES: str = _get("BLOCK_THIRD_PARTY_TYPES", "image,font,media")
+BLOCK_ALLOW_DOMAINS: str = _get("BLOCK_ALLOW_DOMAINS", "hipass.co.kr,ex.co.kr")
+# Hosts aborted for every resource type (analytics / ads)
+BLOCK_DENY_DOMAINS: str = _get(
+    "BLOCK_DENY_DOMAINS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,wcs.naver.net,"
+    "analytics.naver.com,facebook.net",
+)
+
+# Receipt rendering (scraper.capture_date). The popup is resized to
+# RENDER_POPUP_WIDTH x RENDER_POPUP_HEIGHT before the screenshot (0 = keep the size
+# it opened with); RENDER_DEVICE_SCALE > 1 gives sharper, larger images. With
+# RENDER_CLIP the receipt is cut out of a page screenshot by its bounding box instead
+# of using an element screenshot (no scroll-into-view / stability wait).
+RENDER_POPUP_WIDTH: int = int(_get("RENDER_POPUP_WIDTH", "0"))
+RENDER_POPUP_HEIGHT: int = int(_get("RENDER_POPUP_HEIGHT", "0"))
+RENDER_DEVICE_SCALE: float = float(_get("RENDER_DEVICE_SCALE", "1"))
+RENDER_CLIP: bool = _get_bool("RENDER_CLIP")
+RENDER_DISABLE_ANIMATIONS: bool = _get_bool("RENDER_DISABLE_ANIMATIONS", True)
+RENDER_HIDE_CARET: bool = _get_bool("RENDER_HIDE_CARET", True)
+
+# Post-capture processing (app/imaging.py), run in a thread pool off the event loop
+IMAGE_WORKERS: int = int(_get("IMAGE_WORKERS", "2"))
+# Re-encode the captured PNG losslessly with maximum compression (kept only if smaller)
+IMAGE_OPTIMIZE_PNG: bool = _get_bool("IMAGE_OPTIMIZE_PNG", True)
+# Also write a WebP copy next to each PNG; lossless by default — receipts are mostly text
+IMAGE_WEBP: bool = _get_bool("IMAGE_WEBP", True)
+IMAGE_WEBP_LOSSLESS: bool = _get_bool("IMAGE_WEBP_LOSSLESS", True)
+IMAGE_WEBP_QUALITY: int = int(_get("IMAGE_WEBP_QUALITY", "80"))
+THUMBNAIL_WIDTH: int = int(_get("THUMBNAIL_WIDTH", "240"))
+
+# Per-date retry: exponential backoff with jitter between attempts (seconds)
+CAPTURE_MAX_ATTEMPTS: int = int(_get("CAPTURE_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY: float = float(_get("RETRY_BASE_DELAY", "2.0"))
+RETRY_MAX_DELAY: float = float(_get("RETRY_MAX_DELAY", "30.0"))
+# Consecutive failures that pause all capture work, and for how long (seconds)
+BREAKER_THRESHOLD: int = int(_get("BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN: float = float(_get("BREAKER_COOLDOWN", "300"))
+# Upper bound for the lookup spacing, which widens from CAPTURE_COOLDOWN on failures
+CAPTURE_MAX_COOLDOWN: float = float(_get("CAPTURE_MAX_COOLDOWN", "30.0"))
+
+# Threads for filesystem / SQLite work done on behalf of async code (app/diskio.py)
+IO_WORKERS: int = int(_get("IO_WORKERS", "4"))
+# Retention cleanup removes old receipts this many dates per executor call
+RETENTION_BATCH_SIZE: int = int(_get("RETENTION_BATCH_SIZE", "50"))
+# Event-loop lag sampling period (seconds, 0 = off) and the stall worth logging (ms)
+LOOP_LAG_INTERVAL: float = float(_get("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_LAG_WARN_MS: float = float(_get("LOOP_LAG_WARN_MS", "200"))
+
+# Historical backfill (app/backfill.py): dates per capture job, lookup budget per
+# minute across the whole backfill, passes over failed dates, longest accepted range
+BACKFILL_CHUNK_DAYS: int = int(_get("BACKFILL_CHUNK_DAYS", "7"))
+BACKFILL_RPM: float = float(_get("BACKFILL_RPM", "20"))
+BACKFILL_MAX_ATTEMPTS: int = int(_get("BACKFILL_MAX_ATTEMPTS", "3"))
+BACKFILL_MAX_DAYS: int = int(_get("BACKFILL_MAX_DAYS", "400"))
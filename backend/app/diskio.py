@@ -0,0 +1,77 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional, TypeVar
+
+from . import config
+
+T = TypeVar("T")
+
+# Filesystem and SQLite calls made from async code run here, so a slow disk never
+# stalls the loop that also drives Playwright. Separate from the imaging pool:
+# a burst of thumbnail encodes must not queue a listing or a cleanup behind it.
+_executor: Optional[ThreadPoolExecutor] = None
+# Job, progress and capture-log writes go to one writer thread instead: the loop
+# never waits on them, and they land in the order they were queued.
+_writer: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, config.IO_WORKERS), thread_name_prefix="io")
+    return _executor
+
+
+def _write_pool() -> ThreadPoolExecutor:
+    global _writer
+    if _writer is None:
+        _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io-write")
+    return _writer
+
+
+def shutdown() -> None:
+    global _executor, _writer
+    # Queued writes land before the process exits
+    if _writer is not None:
+        _writer.shutdown(wait=True)
+        _writer = None
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_io(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking disk work `fn(*args, **kwargs)` on the I/O executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), functools.partial(fn, *args, **kwargs))
+
+
+def queue_write(fn: Callable[..., T], *args, **kwargs) -> "asyncio.Future[T]":
+    """Queue the SQLite write `fn(*args, **kwargs)` on the writer thread and return
+    without waiting. Writes run one at a time in queue order; awaiting the returned
+    future waits for it and for everything queued before it. Failures are logged."""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_write_pool(), functools.partial(fn, *args, **kwargs))
+    future.add_done_callback(_log_write_failure)
+    return future
+
+
+def _log_write_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[diskio] write failed: {future.exception()}")
+
+
+def unlink_all(paths: Iterable[Path]) -> int:
+    """Remove `paths`, ignoring missing ones (blocking); returns how many were removed."""
+    removed = 0
+    for path in paths:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[diskio] could not remove {path.name}: {e}")
+    return removed
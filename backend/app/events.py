@@ -0,0 +1,61 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Job whose events the current task publishes — set by the scraper for the duration
+# of a capture; worker tasks inherit it, so deep helpers need no job_id parameter.
+current_job: ContextVar[Optional[str]] = ContextVar("current_job", default=None)
+
+_QUEUE_SIZE = 256
+
+
+class EventHub:
+    """In-process pub/sub: per-job fan-out of progress events to SSE subscribers."""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def publish(self, job_id: Optional[str], event: dict) -> None:
+        if not job_id:
+            return
+        for queue in self._subscribers.get(job_id, ()):
+            if queue.full():
+                # Slow consumer — drop its oldest event rather than block the scraper
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @contextmanager
+    def subscribe(self, job_id: str) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+
+hub = EventHub()
+
+
+@contextmanager
+def job_scope(job_id: Optional[str]) -> Iterator[None]:
+    token = current_job.set(job_id)
+    try:
+        yield
+    finally:
+        current_job.reset(token)
+
+
+def step(date_str: str, name: str, **extra) -> None:
+    """Publish a scraper step (login, lookup, popup, saved, empty, …) for the current job."""
+    hub.publish(current_job.get(), {"type": "step", "date": date_str, "step": name, **extra})
+
+
+def sse_format(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
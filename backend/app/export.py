@@ -0,0 +1,124 @@
+import io
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .manifest import Manifest
+
+# Receipts are screenshots at CSS pixel scale; 96 px = 72 pt keeps their printed size
+_PT_PER_PX = 72 / 96
+_PDF_JPEG_QUALITY = 85
+
+
+def month_receipts(manifest: Manifest, month: str) -> list[Path]:
+    """Receipt PNGs captured for 'YYYY-MM', oldest first."""
+    entries = sorted(
+        (e for e in manifest.entries() if e["date"].startswith(month + "-")),
+        key=lambda e: e["date"],
+    )
+    return [manifest.directory / e["filename"] for e in entries]
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink: zipfile falls back to data descriptors,
+    so the archive can be drained and sent after every member."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(paths: Iterable[Path]) -> Iterator[bytes]:
+    """Stream a ZIP of `paths`, holding at most one member in memory.
+    PNGs are already deflated, so members are stored uncompressed."""
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for path in paths:
+            try:
+                zf.write(path, arcname=path.name)
+            except OSError as e:
+                # Deleted by retention cleanup mid-export — skip it
+                print(f"[export] skipping {path.name}: {e}")
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _pdf_obj(num: int, body: bytes) -> bytes:
+    return f"{num} 0 obj\n".encode() + body + b"\nendobj\n"
+
+
+def _jpeg(path: Path) -> tuple[bytes, int, int]:
+    from PIL import Image
+
+    with Image.open(path) as im:
+        rgb = im.convert("RGB")
+        buf = io.BytesIO()
+        rgb.save(buf, "JPEG", quality=_PDF_JPEG_QUALITY, optimize=True)
+        return buf.getvalue(), rgb.width, rgb.height
+
+
+def iter_pdf(paths: Iterable[Path]) -> Iterator[bytes]:
+    """Stream a PDF with one receipt per page, each embedded as a JPEG (DCTDecode).
+
+    Written incrementally: page objects first, then the page tree, catalog and
+    xref table once all offsets are known. Object 1 is the catalog, 2 the page tree."""
+    offsets: dict[int, int] = {}
+    position = 0
+    page_ids: list[int] = []
+    next_id = 3
+
+    def emit(num: int, body: bytes) -> bytes:
+        nonlocal position
+        offsets[num] = position
+        data = _pdf_obj(num, body)
+        position += len(data)
+        return data
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    position += len(header)
+    yield header
+
+    for path in paths:
+        try:
+            jpeg, width, height = _jpeg(path)
+        except OSError as e:
+            print(f"[export] skipping {path.name}: {e}")
+            continue
+        image_id, content_id, page_id = next_id, next_id + 1, next_id + 2
+        next_id += 3
+        page_w, page_h = width * _PT_PER_PX, height * _PT_PER_PX
+
+        yield emit(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height}"
+            f" /ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode"
+            f" /Length {len(jpeg)} >>\nstream\n"
+        ).encode() + jpeg + b"\nendstream")
+        content = f"q {page_w:.2f} 0 0 {page_h:.2f} 0 0 cm /Im0 Do Q".encode()
+        yield emit(content_id, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+        yield emit(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w:.2f} {page_h:.2f}]"
+            f" /Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    yield emit(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+    yield emit(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    size = next_id
+    xref = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+    for num in range(1, size):
+        xref.append(f"{offsets.get(num, 0):010d} 00000 n \n")
+    xref.append(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{position}\n%%EOF\n")
+    yield "".join(xref).encode()
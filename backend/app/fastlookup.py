@@ -0,0 +1,104 @@
+import re
+from datetime import date
+from html.parser import HTMLParser
+from typing import Optional
+
+# How a lookup date can appear in the request the lookup form sends
+_DATE_FORMATS = ("%Y%m%d", "%Y-%m-%d", "%Y.%m.%d")
+# Only these request headers are replayed; cookies come from the browser context
+_REPLAY_HEADERS = ("content-type", "referer")
+
+_NO_DATA_RE = re.compile(r"(내역|데이터|자료)[이가]?\s*없습니다")
+# Dates as they appear in the result table: 2024-05-01, 2024.05.01, 2024/05/01, 20240501
+# (also used by the scraper's range mode)
+DATE_RE = re.compile(r"(20\d{2})[-./]?(0[1-9]|1[0-2])[-./]?(0[1-9]|[12]\d|3[01])")
+
+
+class LookupTemplate:
+    """The request the lookup form sends into the if_main_post frame, learned from one
+    browser lookup and replayed with other dates.
+
+    Nothing about the form is hard-coded: whatever URL, method and body the site used
+    for the learned date are reused, with that date substituted in every format it
+    appeared in."""
+
+    def __init__(self, url: str, method: str, body: Optional[str], headers: dict, learned: date):
+        self.url = url
+        self.method = method
+        self.body = body
+        self.headers = {k: v for k, v in headers.items() if k.lower() in _REPLAY_HEADERS}
+        self.learned = learned
+
+    def usable(self) -> bool:
+        # A request that doesn't carry the date can't be replayed for other dates
+        text = self.url + (self.body or "")
+        return any(self.learned.strftime(fmt) in text for fmt in _DATE_FORMATS)
+
+    def build(self, day: date) -> tuple[str, Optional[str]]:
+        url, body = self.url, self.body
+        for fmt in _DATE_FORMATS:
+            old, new = self.learned.strftime(fmt), day.strftime(fmt)
+            url = url.replace(old, new)
+            if body is not None:
+                body = body.replace(old, new)
+        return url, body
+
+
+class _RowParser(HTMLParser):
+    """Collects the text of <tr> rows inside <tbody> and the visible page text
+    (scripts excluded — they hold alert messages that may never be shown)."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows: list[str] = []
+        self.text: list[str] = []
+        self._tbody = 0
+        self._hidden = 0
+        self._row: Optional[list[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._hidden += 1
+        elif tag == "tbody":
+            self._tbody += 1
+        elif tag == "tr" and self._tbody:
+            self._row = []
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._hidden = max(0, self._hidden - 1)
+        elif tag == "tbody":
+            self._tbody = max(0, self._tbody - 1)
+        elif tag == "tr" and self._row is not None:
+            self.rows.append(" ".join("".join(self._row).split()))
+            self._row = None
+
+    def handle_data(self, data):
+        if self._hidden:
+            return
+        self.text.append(data)
+        if self._row is not None:
+            self._row.append(data)
+
+
+def classify(html: str, day: date) -> Optional[bool]:
+    """True when the lookup result lists transactions on `day`, False when it shows a
+    no-data message, None for anything else (login page, error page, unknown
+    layout) — the caller then has to use the browser instead."""
+    parser = _RowParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        return None
+
+    for row in parser.rows:
+        for y, m, d in DATE_RE.findall(row):
+            try:
+                if date(int(y), int(m), int(d)) == day:
+                    return True
+            except ValueError:
+                continue
+    if _NO_DATA_RE.search(" ".join(parser.text)) and not any(DATE_RE.search(r) for r in parser.rows):
+        return False
+    return None
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from . import config, diskio, metrics
+from .manifest import Manifest
+
+# Pillow releases the GIL while encoding/resizing, so threads are enough to keep
+# image work off the event loop without a process pool's fork/pickling cost.
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, config.IMAGE_WORKERS), thread_name_prefix="imaging")
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _replace_atomic(dest: Path, data: bytes) -> None:
+    # Per-thread temp name: two workers may regenerate the same thumbnail at once
+    tmp = dest.with_name(f"{dest.name}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dest)
+
+
+def _encode(im: Image.Image, fmt: str, **params) -> bytes:
+    buf = io.BytesIO()
+    im.save(buf, fmt, **params)
+    return buf.getvalue()
+
+
+def _pixel_hash(im: Image.Image) -> str:
+    rgb = im.convert("RGB")
+    h = hashlib.sha256(f"{rgb.width}x{rgb.height}".encode())
+    h.update(rgb.tobytes())
+    return h.hexdigest()[:16]
+
+
+def pixel_hash(path: Path) -> str:
+    """Hash of the decoded pixels — unlike the file hash in the manifest it does not
+    change when the PNG is re-encoded (optimized) without changing the image."""
+    with Image.open(path) as im:
+        return _pixel_hash(im)
+
+
+async def content_hash(path: Path) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), pixel_hash, path)
+
+
+def write_thumbnail(im: Image.Image, manifest: Manifest, date_str: str) -> int:
+    """Write the downscaled WebP thumbnail for `date_str`; returns its size in bytes."""
+    thumb = im.copy()
+    width = max(1, config.THUMBNAIL_WIDTH)
+    thumb.thumbnail((width, width * 8), Image.Resampling.LANCZOS)
+    manifest.thumbnail_dir.mkdir(parents=True, exist_ok=True)
+    data = _encode(thumb, "WEBP", quality=75, method=4)
+    _replace_atomic(manifest.thumbnail_path(date_str), data)
+    return len(data)
+
+
+def _thumbnail_fresh(manifest: Manifest, date_str: str) -> bool:
+    try:
+        return manifest.thumbnail_path(date_str).stat().st_mtime >= manifest.path(date_str).stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def ensure_thumbnail(manifest: Manifest, date_str: str) -> Path:
+    """Return the cached thumbnail, regenerating it if missing or older than the receipt (blocking)."""
+    if not _thumbnail_fresh(manifest, date_str):
+        with Image.open(manifest.path(date_str)) as im:
+            metrics.BYTES_WRITTEN.inc(write_thumbnail(im, manifest, date_str))
+    return manifest.thumbnail_path(date_str)
+
+
+def process_receipt(manifest: Manifest, date_str: str) -> dict:
+    """Optimize the captured PNG and write its WebP copy and thumbnail (blocking).
+
+    Returns the resulting sizes in bytes (a variant that was not produced is absent)
+    and the receipt's pixel hash."""
+    src = manifest.path(date_str)
+    sizes = {"png_original": src.stat().st_size}
+    written = 0
+
+    with Image.open(src) as im:
+        im.load()
+        if im.mode not in ("RGB", "RGBA", "L", "P"):
+            im = im.convert("RGBA")
+        sizes["pixel_hash"] = _pixel_hash(im)
+
+        if config.IMAGE_OPTIMIZE_PNG:
+            data = _encode(im, "PNG", optimize=True)
+            if len(data) < sizes["png_original"]:
+                _replace_atomic(src, data)
+                written += len(data)
+        sizes["png"] = src.stat().st_size
+
+        if config.IMAGE_WEBP:
+            data = _encode(
+                im,
+                "WEBP",
+                lossless=config.IMAGE_WEBP_LOSSLESS,
+                quality=config.IMAGE_WEBP_QUALITY,
+                method=6,
+            )
+            _replace_atomic(manifest.webp_path(date_str), data)
+            sizes["webp"] = len(data)
+            written += len(data)
+
+        sizes["thumbnail"] = write_thumbnail(im, manifest, date_str)
+        written += sizes["thumbnail"]
+
+    metrics.BYTES_WRITTEN.inc(written)
+    return sizes
+
+
+async def process(manifest: Manifest, date_str: str, timings: Optional[dict] = None) -> Optional[dict]:
+    """Run process_receipt in the worker pool. Failures are logged, never raised —
+    the original PNG is already saved and stays valid either way."""
+    loop = asyncio.get_running_loop()
+    try:
+        with metrics.span("postprocess", timings):
+            sizes = await loop.run_in_executor(_pool(), process_receipt, manifest, date_str)
+    except Exception as e:
+        print(f"[imaging] {date_str}: post-processing failed: {e}")
+        return None
+    print(f"[imaging] {date_str}: {sizes}")
+    return sizes
+
+
+async def thumbnail(manifest: Manifest, date_str: str) -> Optional[Path]:
+    """Cached thumbnail path; a stale or missing one is rebuilt in the worker pool."""
+    if await diskio.run_io(_thumbnail_fresh, manifest, date_str):
+        return manifest.thumbnail_path(date_str)
+    loop = asyncio.get_running_loop()
+    try:
+        with metrics.span("thumbnail"):
+            return await loop.run_in_executor(_pool(), ensure_thumbnail, manifest, date_str)
+    except Exception as e:
+        print(f"[imaging] {date_str}: thumbnail failed: {e}")
+        return None
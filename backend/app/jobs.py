@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+from typing import Optional
+
+from . import accounts, config, diskio, events, metrics
+from .store import store
+
+# (account, dates, force) — what makes two capture requests identical
+_JobKey = tuple[str, tuple[date, ...], bool]
+
+
+def last_n_days(n: int) -> list[date]:
+    today = date.today()
+    # HiPass registers yesterday's receipts today, so start from yesterday
+    return [today - timedelta(days=i) for i in range(1, n + 1)]
+
+
+class CaptureCoordinator:
+    """Single entry point for capture jobs (API and scheduler).
+
+    - Identical in-flight requests (same account and set of dates) coalesce onto one job id.
+    - Queued jobs run with at most JOB_CONCURRENCY at a time, whatever their account.
+    - A date being captured by one running job is not captured again by another job
+      of the same account; the second job waits for the first job's result instead."""
+
+    def __init__(self, max_concurrent: int):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._inflight: dict[_JobKey, str] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._date_owners: dict[tuple[str, date], asyncio.Future] = {}
+        self._timings: dict[str, dict] = {}
+        self._created: dict[str, asyncio.Future] = {}
+
+    async def submit(
+        self, kind: str, dates: list[date], force: bool = False, account: Optional[str] = None
+    ) -> tuple[str, bool]:
+        """Queue a capture of `dates` for `account` (default: the first configured one);
+        returns (job_id, created). created is False when an identical job is already
+        queued or running and its id is returned instead. `force` re-captures dates
+        that already have a receipt (see scraper.capture_dates)."""
+        account = accounts.get(account).name
+        key = (account, tuple(sorted(set(dates))), force)
+        existing = self._inflight.get(key)
+        if existing is not None:
+            print(f"[jobs] {kind} ({account}): identical job {existing} already in flight")
+            await asyncio.shield(self._created[existing])
+            return existing, False
+
+        job_id = str(uuid.uuid4())
+        current = dates[0].isoformat() if len(dates) == 1 else ""
+        # Queued ahead of the job's progress writes; registered before the await so an
+        # identical request meanwhile coalesces onto this job
+        created = self._created[job_id] = diskio.queue_write(
+            store.create_job, job_id, kind, total=len(key[1]), current_date=current, account=account
+        )
+        self._inflight[key] = job_id
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, key))
+        # The row exists before the id is handed out, so /api/status finds it
+        await asyncio.shield(created)
+        return job_id, True
+
+    async def wait(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def run(
+        self, kind: str, dates: list[date], force: bool = False, account: Optional[str] = None
+    ) -> str:
+        """Submit and wait for completion — used by the scheduler."""
+        job_id, _ = await self.submit(kind, dates, force, account)
+        await self.wait(job_id)
+        return job_id
+
+    def running_jobs(self) -> list[str]:
+        return list(self._tasks)
+
+    def timings(self, job_id: str) -> Optional[dict]:
+        """Live stage breakdown of a running job (finished jobs have it in the store)."""
+        return self._timings.get(job_id)
+
+    async def _run(self, job_id: str, key: _JobKey) -> None:
+        account, dates, force = key
+        # Runs in its own task, so this breakdown is only seen by this job's spans
+        breakdown = self._timings[job_id] = {}
+        metrics.job_timings.set(breakdown)
+        try:
+            async with self._semaphore:
+                with metrics.span("job"):
+                    await self._capture(job_id, account, list(dates), force)
+        except Exception as e:
+            print(f"[jobs] {job_id}: failed: {e}")
+        finally:
+            try:
+                # Lands after the job's queued capture and progress writes
+                await diskio.queue_write(store.finish_job, job_id, breakdown)
+                job = await diskio.run_io(store.get_job, job_id)
+                events.hub.publish(job_id, {"type": "finished", **job})
+            finally:
+                del self._inflight[key]
+                del self._tasks[job_id]
+                del self._timings[job_id]
+                del self._created[job_id]
+
+    async def _capture(self, job_id: str, account: str, dates: list[date], force: bool) -> None:
+        total = len(dates)
+        done = 0
+
+        def report(current_date: str) -> None:
+            nonlocal done
+            done += 1
+            diskio.queue_write(store.update_job, job_id, done, current_date)
+            events.hub.publish(
+                job_id,
+                {"type": "progress", "done": done, "total": total, "current_date": current_date},
+            )
+
+        # Claim the dates no other running job is working on (no await in between,
+        # so two jobs can never claim the same date)
+        loop = asyncio.get_running_loop()
+        mine: dict[date, asyncio.Future] = {}
+        theirs: dict[date, asyncio.Future] = {}
+        for d in dates:
+            owner = self._date_owners.get((account, d))
+            if owner is not None and not owner.done():
+                theirs[d] = owner
+            else:
+                mine[d] = self._date_owners[(account, d)] = loop.create_future()
+        if theirs:
+            print(f"[jobs] {job_id}: {len(theirs)} date(s) already being captured by another job")
+
+        def release(d: date) -> None:
+            future = mine.get(d)
+            if future is None or future.done():
+                return
+            future.set_result(None)
+            if self._date_owners.get((account, d)) is future:
+                del self._date_owners[(account, d)]
+
+        def progress_cb(_done: int, _total: int, current_date: str) -> None:
+            release(date.fromisoformat(current_date))
+            report(current_date)
+
+        try:
+            if mine:
+                # The scraper pulls in Playwright — loaded with the first capture, not at startup
+                from . import scraper
+
+                await scraper.capture_dates(
+                    list(mine), progress_callback=progress_cb, job_id=job_id, force=force, account=account
+                )
+        finally:
+            for d in mine:
+                release(d)
+
+        for d, future in theirs.items():
+            await future
+            report(d.isoformat())
+
+
+coordinator = CaptureCoordinator(config.JOB_CONCURRENCY)
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Optional
+
+from . import config, metrics
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task.
+
+    A task asks to be woken every `interval` seconds; anything beyond that is time
+    the loop spent running something else without yielding — a blocking call in a
+    handler or in the scraper. Each sample goes to the hipass_event_loop_lag_seconds
+    histogram; stalls over `warn_ms` are also logged."""
+
+    def __init__(self, interval: float, warn_ms: float):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            metrics.LOOP_LAG.observe(lag)
+            self.last_ms = lag * 1000
+            self.max_ms = max(self.max_ms, self.last_ms)
+            if self.warn_ms and self.last_ms >= self.warn_ms:
+                self.stalls += 1
+                print(f"[loopmon] event loop stalled for {self.last_ms:.0f} ms")
+
+    def snapshot(self) -> dict:
+        return {
+            "last_ms": round(self.last_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "stalls": self.stalls,
+        }
+
+
+monitor = LoopLagMonitor(config.LOOP_LAG_INTERVAL, config.LOOP_LAG_WARN_MS)
@@ -1,20 +1,34 @@
 import asyncio
+import csv
+import io
 import uuid
 from contextlib import asynccontextmanager
 from datetime import date, timedelta
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from typing import Optional
+from urllib.parse import parse_qs
 
-from fastapi import FastAPI, BackgroundTasks
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi import FastAPI, Query
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
-
-from . import config, scraper, scheduler
-
-# Active background jobs: job_id -> {"total": N, "done": N, "current_date": str, "finished": bool}
-_jobs: dict[str, dict] = {}
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+
+from . import accounts, browser, config, diskio, events, export, imaging, metrics, resilience, scheduler
+from .loopmon import monitor
+from .accounts import Account
+from .backfill import runner as backfill_runner
+from .jobs import coordinator, last_n_days
+from .manifest import manifest_for, manifests, parse_receipt_filename, start_watcher, stop_watcher
+from .store import store
+
+# Cache-Control of responses whose URL changes with their content
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Part of every listing ETag: manifest versions restart with the process, and a
+# deploy may change the page template
+_BOOT_ID = uuid.uuid4().hex[:8]
 
 TEMPLATES_DIR = Path(__file__).parent / "templates"
 STATIC_DIR = Path(__file__).parent / "static"
@@ -24,50 +38,196 @@ templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    monitor.start()
+    await diskio.run_io(accounts.ensure_dirs)
+    stale = await diskio.run_io(store.finish_stale_jobs)
+    if stale:
+        print(f"[main] marked {stale} job(s) interrupted by restart as finished")
+    for manifest in manifests.values():
+        await diskio.run_io(manifest.build)
+    start_watcher()
     scheduler.start(config.SCHEDULE_HOUR)
+    await backfill_runner.resume_all()
+    # Warm the shared Chromium in the background so the first capture skips the cold
+    # start without delaying startup. A launch failure is not fatal here — the pool
+    # retries on first use.
+    warmup = asyncio.create_task(_warm_browser()) if config.BROWSER_WARMUP else None
     yield
-    scheduler.stop()
+    if warmup is not None:
+        warmup.cancel()
+    await stop_watcher()
+    # Running backfills stay "running" in the store and resume on the next start
+    await backfill_runner.stop()
+    await scheduler.stop()
+    imaging.shutdown()
+    await diskio.run_io(store.close)
+    diskio.shutdown()
+    await monitor.stop()
+
+
+async def _warm_browser() -> None:
+    try:
+        await browser.pool.start()
+    except Exception as e:
+        print(f"[main] browser warm-up failed: {e}")
 
 
 app = FastAPI(title="HiPass Receipt Viewer", lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+
+
+class ReceiptFiles(StaticFiles):
+    """StaticFiles restricted to images — SCREENSHOTS_DIR also holds the capture
+    database and the saved login sessions, which must never be served. Receipts of
+    non-default accounts are served from their accounts/<name>/ subdirectory.
+
+    The ETag is the receipt's content hash from the manifest, so revalidation
+    returns 304 until the receipt is re-captured with different content. The listings
+    add that hash as `v` to every URL; such URLs are cached for a year."""
+
+    async def get_response(self, path: str, scope):
+        if Path(path).suffix.lower() not in {".png", ".webp"}:
+            return Response(status_code=404)
+        versioned = "v" in parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        headers = {"Cache-Control": IMMUTABLE if versioned else "no-cache"}
+        etag = _receipt_etag(path)
+        if etag is not None:
+            headers["ETag"] = etag
+            if _etag_matches(Headers(scope=scope), etag):
+                return Response(status_code=304, headers=headers)
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers.update(headers)
+        return response
+
+
+def _receipt_etag(path: str) -> Optional[str]:
+    """Strong ETag of a served receipt file from its manifest entry; None if unknown."""
+    parts = PurePosixPath(path).parts
+    if len(parts) == 1:
+        name, filename = accounts.DEFAULT_ACCOUNT, parts[0]
+    elif len(parts) == 3 and parts[0] == "accounts":
+        name, filename = parts[1], parts[2]
+    else:
+        return None
+    manifest = manifests.get(name)
+    date_str = parse_receipt_filename(str(PurePosixPath(filename).with_suffix(".png")))
+    if manifest is None or date_str is None:
+        return None
+    entry = manifest.get(date_str)
+    if entry is None:
+        return None
+    # The WebP copy is derived from the PNG, so it changes exactly when the PNG does
+    kind = "png" if filename.lower().endswith(".png") else "webp"
+    return f'"{entry["hash"]}-{kind}"'
+
+
+def _etag_matches(request_headers: Headers, etag: str) -> bool:
+    """If-None-Match check with weak comparison (W/ prefixes ignored on both sides)."""
+    candidates = request_headers.get("if-none-match", "")
+    if not candidates:
+        return False
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in candidates.split(","))
+
+
+class _CompressListings:
+    """GZip for HTML pages and API JSON. Images and exports are already compressed,
+    and the SSE stream must reach the browser event by event."""
+
+    _SKIP = ("/api/events/", "/api/export")
+
+    def __init__(self, app, minimum_size: int):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=6)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if (path == "/" or path.startswith("/api/")) and not path.startswith(self._SKIP):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(_CompressListings, minimum_size=config.GZIP_MIN_SIZE)
+
+
+# The directory is created by the lifespan, not at import
 app.mount(
     "/screenshots",
-    StaticFiles(directory=str(config.SCREENSHOTS_DIR)),
+    ReceiptFiles(directory=str(config.SCREENSHOTS_DIR), check_dir=False),
     name="screenshots",
 )
 
 
-def _list_screenshots() -> list[dict]:
-    """Return sorted list of {date, filename} for existing PNGs."""
+def _account(name: Optional[str]) -> Optional[Account]:
+    """Account selected by an `account` query parameter (None → the first one);
+    None if no such account is configured."""
+    try:
+        return accounts.get(name)
+    except KeyError:
+        return None
+
+
+def _unknown_account(name: Optional[str]) -> JSONResponse:
+    return JSONResponse({"error": f"알 수 없는 계정: {name}"}, status_code=404)
+
+
+def _list_screenshots(account: Account) -> list[dict]:
+    """Return the retention window, newest first, joined with the account's receipt manifest."""
+    manifest = manifest_for(account.name)
     results = []
     today = date.today()
-    cutoff = today - timedelta(days=config.RETENTION_DAYS - 1)
 
     for i in range(config.RETENTION_DAYS):
-        d = today - timedelta(days=i)
-        if d < cutoff:
-            break
-        date_str = d.strftime("%Y-%m-%d")
-        filename = f"하이패스({date_str}).png"
-        exists = (config.SCREENSHOTS_DIR / filename).exists()
+        date_str = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+        entry = manifest.get(date_str)
         results.append(
             {
                 "date": date_str,
-                "filename": filename if exists else None,
-                "exists": exists,
+                "filename": entry["filename"] if entry else None,
+                "exists": entry is not None,
+                "size": entry["size"] if entry else None,
+                "mtime": entry["mtime"] if entry else None,
+                "hash": entry["hash"] if entry else None,
+                "webp": entry["webp"] if entry else None,
+                "url": f"/screenshots/{account.url_prefix}{entry['filename']}?v={entry['hash']}" if entry else None,
+                "webp_url": (
+                    f"/screenshots/{account.url_prefix}{entry['webp']}?v={entry['hash']}"
+                    if entry and entry["webp"] else None
+                ),
             }
         )
     return results
 
 
+def _listing_etag(account: Account) -> str:
+    # The listing only changes when the manifest does or the window rolls over
+    version = manifest_for(account.name).version
+    return f'W/"{_BOOT_ID}-{account.name}-{version}-{date.today().isoformat()}-{config.RETENTION_DAYS}"'
+
+
 @app.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    screenshots = _list_screenshots()
+async def index(request: Request, account: Optional[str] = None):
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    # The page embeds the listing, so it changes exactly when the listing does
+    etag = _listing_etag(selected).replace('W/"', 'W/"page-', 1)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers, etag):
+        return Response(status_code=304, headers=headers)
+    screenshots = _list_screenshots(selected)
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "screenshots": screenshots},
+        {
+            "request": request,
+            "screenshots": screenshots,
+            "account": selected.name,
+            "accounts": [a.name for a in accounts.all_accounts()],
+        },
+        headers=headers,
     )
 
 
@@ -81,74 +241,308 @@ async def favicon():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "circuit": resilience.breaker.state, "loop_lag": monitor.snapshot()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/thumbnails/{date_str}")
+async def thumbnail(date_str: str, v: Optional[str] = None, account: Optional[str] = None):
+    """Downscaled WebP of one receipt from the disk cache (rebuilt when the PNG is newer).
+    Requests carrying the receipt mtime as `v` are cached by the browser for a year."""
+    selected = _account(account)
+    if selected is None:
+        return Response(status_code=404)
+    manifest = manifest_for(selected.name)
+    if manifest.get(date_str) is None:
+        return Response(status_code=404)
+    path = await imaging.thumbnail(manifest, date_str)
+    if path is None:
+        return Response(status_code=404)
+    cache = "public, max-age=31536000, immutable" if v else "public, max-age=300"
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": cache})
+
+
+@app.get("/api/accounts")
+async def api_accounts():
+    """Configured accounts (never their credentials); the first one is the default."""
+    return [a.public() for a in accounts.all_accounts()]
 
 
 @app.get("/api/screenshots")
-async def api_screenshots():
-    return _list_screenshots()
+async def api_screenshots(request: Request, account: Optional[str] = None):
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    etag = _listing_etag(selected)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(_list_screenshots(selected), headers=headers)
 
 
 @app.post("/api/refresh")
-async def api_refresh(background_tasks: BackgroundTasks):
-    job_id = str(uuid.uuid4())
-    _jobs[job_id] = {"total": config.RETENTION_DAYS, "done": 0, "current_date": "", "finished": False}
-
-    def progress_cb(done: int, total: int, current_date: str):
-        _jobs[job_id]["done"] = done
-        _jobs[job_id]["current_date"] = current_date
+async def api_refresh(force: bool = False, account: Optional[str] = None):
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    job_id, created = await coordinator.submit(
+        "refresh", last_n_days(config.RETENTION_DAYS), force, selected.name
+    )
+    return {"job_id": job_id, "deduplicated": not created}
 
-    async def run():
-        await scraper.capture_last_n_days(
-            n=config.RETENTION_DAYS, progress_callback=progress_cb
-        )
-        _jobs[job_id]["finished"] = True
 
-    background_tasks.add_task(run)
-    return {"job_id": job_id}
+@app.get("/api/schedule")
+async def api_schedule(account: Optional[str] = None):
+    """Next automatic run and the dates it would capture / re-check."""
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    return await diskio.run_io(scheduler.status, selected.name)
 
 
 @app.get("/api/status/{job_id}")
 async def api_status(job_id: str):
-    job = _jobs.get(job_id)
+    job = await diskio.run_io(store.get_job, job_id)
     if job is None:
         return {"error": "not found"}
+    live = coordinator.timings(job_id)
+    if live is not None:
+        job["timings"] = live
     return job
 
 
+@app.get("/api/events/{job_id}")
+async def api_events(job_id: str):
+    """Server-Sent Events stream of one job: a status snapshot, then progress/step/result
+    events as the scraper publishes them, ending with `finished`."""
+    if await diskio.run_io(store.get_job, job_id) is None:
+        return JSONResponse({"error": "not found"}, status_code=404)
+
+    async def stream():
+        with events.hub.subscribe(job_id) as queue:
+            # Snapshot after subscribing so nothing published in between is missed
+            job = await diskio.run_io(store.get_job, job_id)
+            yield events.sse_format({"type": "status", **job})
+            if job["finished"]:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield events.sse_format(event)
+                if event["type"] == "finished":
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/capture/{date_str}")
-async def api_capture_single(date_str: str, background_tasks: BackgroundTasks):
+async def api_capture_single(date_str: str, force: bool = False, account: Optional[str] = None):
     try:
         target_date = date.fromisoformat(date_str)
     except ValueError:
         return {"error": f"날짜 형식 오류: {date_str!r} (YYYY-MM-DD 필요)"}
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
 
-    job_id = str(uuid.uuid4())
-    _jobs[job_id] = {"total": 1, "done": 0, "current_date": date_str, "finished": False}
-
-    def progress_cb(done: int, total: int, current_date: str):
-        _jobs[job_id]["done"] = done
-        _jobs[job_id]["current_date"] = current_date
-
-    async def run():
-        await scraper.capture_single_date_standalone(
-            target_date=target_date, progress_callback=progress_cb
-        )
-        _jobs[job_id]["finished"] = True
-
-    background_tasks.add_task(run)
-    return {"job_id": job_id}
+    job_id, created = await coordinator.submit("single", [target_date], force, selected.name)
+    return {"job_id": job_id, "deduplicated": not created}
 
 
 @app.get("/api/logs")
-async def api_logs():
-    return scraper.capture_logs
+async def api_logs(request: Request, limit: int = Query(20, ge=1, le=500), account: Optional[str] = None):
+    """Most recent capture entries (newest first) — the UI's log panel. Versioned by
+    the newest capture id: unchanged logs are answered with 304."""
+    version = await diskio.run_io(store.captures_version)
+    etag = f'W/"{_BOOT_ID}-logs-{version}-{limit}-{account or "*"}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers, etag):
+        return Response(status_code=304, headers=headers)
+    _, items = await diskio.run_io(store.list_captures, limit=limit, account=account)
+    return JSONResponse(items, headers=headers)
+
+
+@app.get("/api/history")
+async def api_history(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    day: Optional[str] = Query(None, alias="date"),
+    status: Optional[str] = None,
+    job_id: Optional[str] = None,
+    account: Optional[str] = None,
+):
+    total, items = await diskio.run_io(
+        store.list_captures, limit=limit, offset=offset, date=day, status=status, job_id=job_id, account=account
+    )
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+
+@app.get("/api/receipts")
+async def api_receipts(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    format: str = Query("json", pattern="^(json|csv)$"),
+    account: Optional[str] = None,
+):
+    """Transaction rows extracted from the receipts, with server-side totals.
+    Defaults to the retention window and all accounts; rows outlive the screenshot files."""
+    try:
+        end_date = date.fromisoformat(end) if end else date.today()
+        start_date = date.fromisoformat(start) if start else end_date - timedelta(days=config.RETENTION_DAYS)
+    except ValueError:
+        return JSONResponse({"error": "날짜 형식 오류 (YYYY-MM-DD 필요)"}, status_code=400)
+    start, end = start_date.isoformat(), end_date.isoformat()
+    items = await diskio.run_io(store.list_receipts, start, end, account)
+
+    if format == "csv":
+        def rows():
+            # BOM so Excel opens the Korean columns as UTF-8
+            yield "\ufeff" + _csv_line(["account", "date", "passed_at", "gate", "amount", "card"])
+            for r in items:
+                yield _csv_line([r["account"], r["date"], r["passed_at"], r["gate"], r["amount"], r["card"]])
+
+        return StreamingResponse(
+            rows(),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="hipass-receipts-{start}_{end}.csv"'},
+        )
+    summary = await diskio.run_io(store.summarize_receipts, start, end, account)
+    return {"from": start, "to": end, "summary": summary, "items": items}
+
+
+def _csv_line(values: list) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(["" if v is None else v for v in values])
+    return buf.getvalue()
+
+
+@app.get("/api/revisions")
+async def api_revisions(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    day: Optional[str] = Query(None, alias="date"),
+    account: Optional[str] = None,
+):
+    """Re-capture history: one row per check, `changed` when the stored receipt was replaced."""
+    total, items = await diskio.run_io(store.list_revisions, date=day, limit=limit, offset=offset, account=account)
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+
+@app.get("/api/jobs")
+async def api_jobs(
+    limit: int = Query(20, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    account: Optional[str] = None,
+):
+    total, items = await diskio.run_io(store.list_jobs, limit=limit, offset=offset, account=account)
+    return {"total": total, "limit": limit, "offset": offset, "items": items}
+
+
+@app.post("/api/backfill")
+async def api_backfill_start(
+    from_: str = Query(..., alias="from"),
+    to: str = Query(...),
+    force: bool = False,
+    account: Optional[str] = None,
+):
+    """Capture an arbitrary past range in checkpointed chunks (see app/backfill.py)."""
+    try:
+        start, end = date.fromisoformat(from_), date.fromisoformat(to)
+    except ValueError:
+        return JSONResponse({"error": "날짜 형식 오류 (YYYY-MM-DD 필요)"}, status_code=400)
+    if start > end:
+        return JSONResponse({"error": "시작일이 종료일보다 늦습니다"}, status_code=400)
+    if end > date.today():
+        return JSONResponse({"error": "미래 날짜는 조회할 수 없습니다"}, status_code=400)
+    if (end - start).days + 1 > config.BACKFILL_MAX_DAYS:
+        return JSONResponse(
+            {"error": f"기간이 너무 깁니다 (최대 {config.BACKFILL_MAX_DAYS}일)"}, status_code=400
+        )
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    backfill, created = await backfill_runner.start(selected.name, start, end, force)
+    return {**backfill, "deduplicated": not created}
+
+
+@app.get("/api/backfill")
+async def api_backfill_list(account: Optional[str] = None):
+    return await diskio.run_io(store.list_backfills, account=account)
+
+
+@app.get("/api/backfill/{backfill_id}")
+async def api_backfill_status(backfill_id: str):
+    backfill = await diskio.run_io(store.get_backfill, backfill_id)
+    if backfill is None:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return backfill
+
+
+@app.post("/api/backfill/{backfill_id}/pause")
+async def api_backfill_pause(backfill_id: str):
+    if await diskio.run_io(store.get_backfill, backfill_id) is None:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    await backfill_runner.pause(backfill_id)
+    return await diskio.run_io(store.get_backfill, backfill_id)
+
+
+@app.post("/api/backfill/{backfill_id}/resume")
+async def api_backfill_resume(backfill_id: str):
+    if await diskio.run_io(store.get_backfill, backfill_id) is None:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    await backfill_runner.resume(backfill_id)
+    return await diskio.run_io(store.get_backfill, backfill_id)
+
+
+@app.delete("/api/backfill/{backfill_id}")
+async def api_backfill_delete(backfill_id: str):
+    """Forget a backfill and its checkpoints; receipts already captured are kept."""
+    if not await backfill_runner.delete(backfill_id):
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return {"deleted": backfill_id}
+
+
+@app.get("/api/export")
+async def api_export(
+    month: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
+    format: str = Query("zip", pattern="^(zip|pdf)$"),
+    account: Optional[str] = None,
+):
+    """One month's receipts of one account as a single ZIP or PDF, streamed file by file."""
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    paths = export.month_receipts(manifest_for(selected.name), month)
+    if not paths:
+        return JSONResponse({"error": f"{month} 영수증 없음"}, status_code=404)
+    # The default account keeps the old file name
+    suffix = "" if selected.name == accounts.DEFAULT_ACCOUNT else f"-{selected.name}"
+    if format == "pdf":
+        body, media_type = export.iter_pdf(paths), "application/pdf"
+    else:
+        body, media_type = export.iter_zip(paths), "application/zip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="hipass{suffix}-{month}.{format}"'},
+    )
 
 
 @app.post("/api/screenshots/delete-all")
-async def api_delete_all():
-    deleted = 0
-    for f in config.SCREENSHOTS_DIR.glob("*.png"):
-        f.unlink()
-        deleted += 1
-    return {"deleted": deleted}
+async def api_delete_all(account: Optional[str] = None):
+    selected = _account(account)
+    if selected is None:
+        return _unknown_account(account)
+    return {"deleted": await manifest_for(selected.name).delete_all()}
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from . import accounts, config, diskio
+
+_PREFIX = "하이패스("
+_SUFFIX = ").png"
+
+
+def receipt_filename(date_str: str) -> str:
+    return f"{_PREFIX}{date_str}{_SUFFIX}"
+
+
+def webp_filename(date_str: str) -> str:
+    return f"{_PREFIX}{date_str}).webp"
+
+
+def parse_receipt_filename(name: str) -> Optional[str]:
+    """'하이패스(YYYY-MM-DD).png' → 'YYYY-MM-DD', or None for any other file."""
+    if not (name.startswith(_PREFIX) and name.endswith(_SUFFIX)):
+        return None
+    date_str = name[len(_PREFIX):-len(_SUFFIX)]
+    if len(date_str) != 10 or date_str[4] != "-" or date_str[7] != "-":
+        return None
+    return date_str
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+class Manifest:
+    """In-memory index of captured receipts: date → {filename, size, mtime, hash, webp}.
+
+    Built with one directory scan, then kept current by the scraper/scheduler calling
+    add()/delete() and, optionally, by a filesystem watcher. `version` increases on
+    every change so listings can be served with a cheap ETag."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        # Derived images written by app/imaging.py; removed together with their receipt
+        self.thumbnail_dir = directory / "thumbnails"
+        self._entries: dict[str, dict] = {}
+        self._built = False
+        self.version = 0
+
+    def build(self) -> None:
+        entries = {}
+        for path in self.directory.glob(f"{_PREFIX}*{_SUFFIX}"):
+            entry = self._stat_entry(path)
+            if entry:
+                entries[entry["date"]] = entry
+        self._entries = entries
+        self._built = True
+        self.version += 1
+        print(f"[manifest] indexed {len(entries)} receipt(s)")
+
+    def path(self, date_str: str) -> Path:
+        return self.directory / receipt_filename(date_str)
+
+    def webp_path(self, date_str: str) -> Path:
+        return self.directory / webp_filename(date_str)
+
+    def thumbnail_path(self, date_str: str) -> Path:
+        return self.thumbnail_dir / f"{date_str}.webp"
+
+    def _ensure_built(self) -> None:
+        if not self._built:
+            self.build()
+
+    def _stat_entry(self, path: Path) -> Optional[dict]:
+        date_str = parse_receipt_filename(path.name)
+        if date_str is None:
+            return None
+        try:
+            st = path.stat()
+            digest = _file_hash(path)
+        except OSError:
+            return None
+        webp = self.webp_path(date_str)
+        return {
+            "date": date_str,
+            "filename": path.name,
+            "size": st.st_size,
+            "mtime": int(st.st_mtime),
+            "hash": digest,
+            "webp": webp.name if webp.exists() else None,
+        }
+
+    def get(self, date_str: str) -> Optional[dict]:
+        self._ensure_built()
+        return self._entries.get(date_str)
+
+    def entries(self) -> list[dict]:
+        self._ensure_built()
+        return list(self._entries.values())
+
+    # The methods below are called from the event loop: the stat/hash/unlink work runs
+    # on the I/O executor, while the index itself is only ever changed on the loop.
+
+    async def add(self, filename: str) -> Optional[dict]:
+        """Index (or re-index) a receipt file that was just written."""
+        self._ensure_built()
+        entry = await diskio.run_io(self._stat_entry, self.directory / filename)
+        if entry and entry != self._entries.get(entry["date"]):
+            self._entries[entry["date"]] = entry
+            self.version += 1
+        return entry
+
+    async def refresh(self, filename: str) -> None:
+        """Reconcile one file with disk — used by the watcher for external changes."""
+        date_str = parse_receipt_filename(filename)
+        if date_str is None:
+            return
+        if await diskio.run_io((self.directory / filename).exists):
+            await self.add(filename)
+        elif self._entries.pop(date_str, None) is not None:
+            self.version += 1
+
+    async def delete_many(self, dates: list[str]) -> int:
+        """Drop `dates` from the index and remove their receipt, WebP and thumbnail
+        files in one executor call; returns how many receipts were indexed."""
+        self._ensure_built()
+        paths = []
+        for date_str in dates:
+            entry = self._entries.pop(date_str, None)
+            if entry is None:
+                continue
+            paths += [self.directory / entry["filename"], self.webp_path(date_str), self.thumbnail_path(date_str)]
+        if not paths:
+            return 0
+        self.version += 1
+        await diskio.run_io(diskio.unlink_all, paths)
+        return len(paths) // 3
+
+    async def delete(self, date_str: str) -> bool:
+        return await self.delete_many([date_str]) > 0
+
+    def _delete_files(self) -> int:
+        deleted = diskio.unlink_all(self.directory.glob("*.png"))
+        diskio.unlink_all([*self.directory.glob("*.webp"), *self.thumbnail_dir.glob("*.webp")])
+        return deleted
+
+    async def delete_all(self) -> int:
+        deleted = await diskio.run_io(self._delete_files)
+        self._entries = {}
+        self._built = True
+        self.version += 1
+        return deleted
+
+    async def watch(self, stop_event: asyncio.Event) -> None:
+        """Follow external changes to the directory (inotify via watchfiles, if installed)."""
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            print("[manifest] watchfiles not installed — filesystem watching disabled")
+            return
+        async for changes in awatch(self.directory, recursive=False, stop_event=stop_event):
+            for _, path in changes:
+                await self.refresh(Path(path).name)
+
+
+# One manifest per account (see app/accounts.py), each over its own directory
+manifests: dict[str, Manifest] = {a.name: Manifest(a.directory) for a in accounts.all_accounts()}
+
+
+def manifest_for(account_name: Optional[str] = None) -> Manifest:
+    """Manifest of an account; None selects the first configured one. KeyError if unknown."""
+    return manifests[accounts.get(account_name).name]
+
+
+_watch_stop: Optional[asyncio.Event] = None
+_watch_tasks: list[asyncio.Task] = []
+
+
+def start_watcher() -> None:
+    global _watch_stop
+    if not config.MANIFEST_WATCH or _watch_tasks:
+        return
+    _watch_stop = asyncio.Event()
+    _watch_tasks.extend(asyncio.create_task(m.watch(_watch_stop)) for m in manifests.values())
+
+
+async def stop_watcher() -> None:
+    if not _watch_tasks:
+        return
+    _watch_stop.set()
+    for task in _watch_tasks:
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except Exception:
+            task.cancel()
+    _watch_tasks.clear()
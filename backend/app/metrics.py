@@ -0,0 +1,104 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+
+def process_tree_rss_mb(root_pid: Optional[int] = None) -> float:
+    """Sum the RSS of root_pid and all of its descendants, in MB.
+    Chromium runs as grandchildren of this process (python → playwright driver → chrome),
+    so this covers the whole browser footprint. Linux-only; returns 0.0 elsewhere."""
+    root_pid = root_pid or os.getpid()
+    proc = Path("/proc")
+    if not proc.exists():
+        return 0.0
+
+    children: dict[int, list[int]] = {}
+    rss_pages: dict[int, int] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            statm = (entry / "statm").read_text()
+        except OSError:
+            continue
+        # comm (field 2) may contain spaces — split after the closing paren
+        fields = stat[stat.rfind(")") + 2:].split()
+        pid = int(entry.name)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss_pages[pid] = int(statm.split()[1])
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+STAGE_SECONDS = Histogram(
+    "hipass_stage_seconds",
+    "Time spent in each scraper stage",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+CAPTURES = Counter("hipass_captures_total", "Per-date capture outcomes", ["status"])
+BROWSER_LAUNCHES = Counter("hipass_browser_launches_total", "Chromium launches by the browser pool")
+RETRIES = Counter("hipass_retries_total", "Scraper retries and recoveries", ["reason"])
+BYTES_WRITTEN = Counter("hipass_bytes_written_total", "Receipt image bytes written to disk")
+BLOCKED_REQUESTS = Counter(
+    "hipass_blocked_requests_total", "Browser requests aborted by the resource blocker", ["resource_type", "reason"]
+)
+TRANSFERRED_BYTES = Counter(
+    "hipass_transferred_bytes_total", "Response bytes (headers + body) received by Chromium", ["resource_type"]
+)
+FAST_LOOKUPS = Counter(
+    "hipass_fast_lookups_total", "HTTP fast-path lookups by outcome (data, empty, fallback)", ["outcome"]
+)
+CIRCUIT_OPEN = Gauge("hipass_circuit_open", "1 while the circuit breaker pauses capture work")
+LOOKUP_INTERVAL = Gauge("hipass_lookup_interval_seconds", "Current adaptive spacing between lookups")
+LOOP_LAG = Histogram(
+    "hipass_event_loop_lag_seconds",
+    "How late the event loop woke a periodic timer (time spent blocked)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+PROCESS_RSS = Gauge("hipass_process_tree_rss_bytes", "RSS of this process and its Chromium children")
+PROCESS_RSS.set_function(lambda: process_tree_rss_mb() * 1024 * 1024)
+
+# Stage breakdown of the job the current task belongs to: stage → {count, total_ms, max_ms}.
+# Set by the job coordinator; capture workers inherit it through the task context.
+job_timings: ContextVar[Optional[dict]] = ContextVar("job_timings", default=None)
+
+
+def observe(stage: str, seconds: float, timings: Optional[dict] = None) -> None:
+    """Record one stage duration in the histogram, the current job's breakdown and,
+    if given, a per-date `timings` dict (milliseconds)."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    ms = round(seconds * 1000)
+    if timings is not None:
+        timings[stage] = ms
+    breakdown = job_timings.get()
+    if breakdown is not None:
+        slot = breakdown.setdefault(stage, {"count": 0, "total_ms": 0, "max_ms": 0})
+        slot["count"] += 1
+        slot["total_ms"] += ms
+        slot["max_ms"] = max(slot["max_ms"], ms)
+
+
+@contextmanager
+def span(stage: str, timings: Optional[dict] = None) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started, timings)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
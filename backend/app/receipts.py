@@ -0,0 +1,57 @@
+import re
+from typing import Optional
+
+# One pass over `.popup_content`: its text (for change detection) and the cell
+# texts of every table row that has <td> cells (header rows use <th> only).
+EXTRACT_JS = """el => ({
+  text: el.innerText,
+  rows: Array.from(el.querySelectorAll('tr'))
+    .map(tr => Array.from(tr.querySelectorAll('td')).map(td => td.innerText.trim()))
+    .filter(cells => cells.length > 0),
+})"""
+
+_TIME_RE = re.compile(r"(?:(\d{4})[-./](\d{2})[-./](\d{2})\s*)?(\d{1,2}):(\d{2})(?::(\d{2}))?")
+_DATE_ONLY_RE = re.compile(r"^\d{4}[-./]\d{2}[-./]\d{2}\.?$")
+_AMOUNT_RE = re.compile(r"^(\d[\d,]*)\s*원?$")
+# Full 4-4-4-4 numbers, or masked ones (at least one *) in shorter groups
+_CARD_RE = re.compile(r"^(?:[\d*]{4}[- ]){3}[\d*]{4}$|^(?=.*\*)[\d*]{4}(?:[- ][\d*]{2,4}){2,3}$")
+
+
+def parse_row(cells: list[str], date_str: str) -> Optional[dict]:
+    """Map one receipt table row to {passed_at, gate, amount, card}.
+
+    Columns are recognised by content rather than position: the first cell holding
+    a time is the passage time (later ones, e.g. an exit time, are ignored), a
+    masked or 4-4-4-4 card number the card, and the first remaining text cell
+    (not a bare date or punctuation) the toll gate. Rows can hold several numbers
+    (sequence number, toll, discount), so the toll is the first amount written
+    with 원, else the largest number in the row. Rows without a time (totals,
+    notices) are not transactions and yield None."""
+    passed_at = gate = card = None
+    marked: Optional[int] = None
+    numbers: list[int] = []
+    for cell in cells:
+        if m := _TIME_RE.search(cell):
+            if passed_at is None:
+                day = f"{m[1]}-{m[2]}-{m[3]}" if m[1] else date_str
+                passed_at = f"{day} {int(m[4]):02d}:{m[5]}" + (f":{m[6]}" if m[6] else "")
+        elif _DATE_ONLY_RE.match(cell):
+            continue
+        elif card is None and _CARD_RE.match(cell):
+            card = cell
+        elif m := _AMOUNT_RE.match(cell):
+            value = int(m[1].replace(",", ""))
+            numbers.append(value)
+            if marked is None and cell.endswith("원"):
+                marked = value
+        elif gate is None and any(c.isalnum() for c in cell):
+            gate = cell
+    if passed_at is None:
+        return None
+    amount = marked if marked is not None else max(numbers, default=None)
+    return {"passed_at": passed_at, "gate": gate or "", "amount": amount, "card": card or "", "cells": cells}
+
+
+def parse_rows(rows: list[list[str]], date_str: str) -> list[dict]:
+    parsed = (parse_row(cells, date_str) for cells in rows)
+    return [r for r in parsed if r is not None]
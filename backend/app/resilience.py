@@ -0,0 +1,118 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+from . import config, events, metrics
+
+
+class SessionExpired(Exception):
+    """HiPass bounced a page back to the login form in the middle of a job."""
+
+
+class LoginRejected(RuntimeError):
+    """The login form did not accept the credentials. Never retried — repeated
+    failed logins can lock the HiPass account."""
+
+
+def classify(exc: BaseException) -> str:
+    """Failure class of one capture attempt, used for the retry decision and as the
+    RETRIES metric label. "No data" is not an exception (capture_date returns None)."""
+    # Only ever called after a capture ran, so Playwright is already loaded
+    from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+    if isinstance(exc, SessionExpired):
+        return "session"
+    if isinstance(exc, LoginRejected):
+        return "auth"
+    if isinstance(exc, (PlaywrightTimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(exc, PlaywrightError) and "net::" in str(exc):
+        return "network"
+    return "error"
+
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait after failed attempt number `attempt` (1-based): exponential
+    from RETRY_BASE_DELAY, capped at RETRY_MAX_DELAY, with ±50% jitter so workers
+    that failed together do not retry in lockstep."""
+    delay = min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.5)
+
+
+class CircuitBreaker:
+    """Pauses all capture work while HiPass is failing.
+
+    After `threshold` consecutive failures (across all jobs and workers) the circuit
+    opens and every caller of wait() sleeps for `cooldown` seconds. Then one probe
+    attempt is let through (half-open): success closes the circuit, failure opens
+    it for another cooldown."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # Token of the caller holding the half-open probe, if any
+        self._probe: Optional[object] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    async def wait(self, probe: bool = True) -> Optional[object]:
+        """Sleep while the circuit is open. In half-open, one caller with `probe` gets
+        through and receives a token: its attempt must end in record_success(),
+        record_failure() or release(token). Returns None for everyone else.
+
+        With probe=False only the open period is waited out — for callers about to
+        acquire resources (a browser context) rather than to hit the site."""
+        announced = False
+        while True:
+            state = self.state
+            if state == "closed":
+                return None
+            if state == "half_open":
+                if not probe:
+                    return None
+                if self._probe is None:
+                    self._probe = object()
+                    print("[breaker] half-open — sending a probe request")
+                    return self._probe
+            if not announced:
+                print(f"[breaker] {state} — capture paused")
+                events.step("", "paused")
+                announced = True
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            await asyncio.sleep(max(1.0, min(remaining, 30.0)))
+
+    def release(self, token: Optional[object]) -> None:
+        """Hand back a probe whose attempt said nothing about the site (rejected
+        login, lost session, cancellation); the next caller probes instead.
+        No-op if `token` no longer holds the probe."""
+        if token is not None and self._probe is token:
+            self._probe = None
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe = None
+        if self._opened_at is not None:
+            self._opened_at = None
+            metrics.CIRCUIT_OPEN.set(0)
+            print("[breaker] closed — site is responding again")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        probe_failed = self._probe is not None
+        self._probe = None
+        if probe_failed or (self._opened_at is None and self._failures >= self.threshold):
+            self._opened_at = time.monotonic()
+            metrics.CIRCUIT_OPEN.set(1)
+            print(f"[breaker] open after {self._failures} consecutive failure(s) — pausing {self.cooldown:.0f}s")
+
+
+breaker = CircuitBreaker(config.BREAKER_THRESHOLD, config.BREAKER_COOLDOWN)
@@ -1,32 +1,156 @@
 import asyncio
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from . import config
-from . import scraper
+from . import accounts, browser, config
+from .backfill import in_backfill
+from .diskio import run_io
+from .jobs import coordinator, last_n_days
+from .manifest import manifest_for, manifests
+from .store import store
 
 
 scheduler = AsyncIOScheduler()
 
+_FOLLOWUP_JOB_ID = "empty_followup"
 
-def delete_old_screenshots() -> None:
-    cutoff = date.today() - timedelta(days=config.RETENTION_DAYS)
-    for png in config.SCREENSHOTS_DIR.glob("하이패스(*.png"):
-        # Filename pattern: 하이패스(YYYY-MM-DD).png
-        name = png.stem  # 하이패스(YYYY-MM-DD)
-        try:
-            date_part = name[4:-1]  # strip '하이패스(' and ')'
-            file_date = date.fromisoformat(date_part)
-            if file_date < cutoff:
-                png.unlink()
-        except Exception:
-            continue
+
+def _followup_job_id(account: str) -> str:
+    return f"{_FOLLOWUP_JOB_ID}:{account}"
+
+
+async def delete_old_screenshots() -> int:
+    """Remove receipts past the retention window; returns how many were removed.
+
+    Files are unlinked on the I/O executor RETENTION_BATCH_SIZE dates at a time, so a
+    large backlog (first run after a long outage, RETENTION_DAYS lowered) neither
+    blocks the loop nor occupies every I/O thread at once. Dates inside a backfill's
+    range are kept — they were fetched on purpose, long past the window."""
+    cutoff = (date.today() - timedelta(days=config.RETENTION_DAYS)).isoformat()
+    batch = max(1, config.RETENTION_BATCH_SIZE)
+    removed = 0
+    for name, manifest in manifests.items():
+        kept = await run_io(store.backfill_ranges, name)
+        # ISO dates compare correctly as strings
+        old = sorted(
+            e["date"] for e in manifest.entries()
+            if e["date"] < cutoff and not in_backfill(e["date"], kept)
+        )
+        for i in range(0, len(old), batch):
+            removed += await manifest.delete_many(old[i:i + batch])
+    if removed:
+        print(f"[scheduler] removed {removed} receipt(s) older than {cutoff}")
+    return removed
+
+
+def plan(account: Optional[str] = None) -> dict:
+    """Dates the next scheduled run will touch, worked out from the receipt manifest
+    and the capture history — no browser involved.
+
+    - due: no receipt and either the last check was not empty (never checked, failed,
+      or the receipt was captured and later deleted), or it came back empty within
+      EMPTY_RECHECK_DAYS and not yet today (late postings). Older empty days are
+      settled.
+    - recheck: already captured within RECHECK_DAYS — forced re-capture that only
+      replaces the receipt if it changed."""
+    account = accounts.get(account).name
+    manifest = manifest_for(account)
+    today = date.today()
+    window = last_n_days(config.RETENTION_DAYS)
+    missing = [d for d in window if not manifest.get(d.isoformat())]
+    checks = store.last_checks([d.isoformat() for d in missing], account)
+    empty_cutoff = today - timedelta(days=config.EMPTY_RECHECK_DAYS)
+
+    due = []
+    for d in missing:
+        last = checks.get(d.isoformat())
+        if last is None or last["status"] != "empty":
+            due.append(d)
+        elif last["status"] == "empty" and d >= empty_cutoff and last["timestamp"][:10] < today.isoformat():
+            due.append(d)
+
+    recheck = [
+        d for d in last_n_days(min(config.RECHECK_DAYS, config.RETENTION_DAYS))
+        if manifest.get(d.isoformat())
+    ]
+    return {"due": due, "recheck": recheck}
 
 
 async def scheduled_capture() -> None:
-    delete_old_screenshots()
-    await scraper.capture_last_n_days(n=config.RETENTION_DAYS)
+    await delete_old_screenshots()
+    # Accounts run side by side; the coordinator caps how many jobs capture at once
+    await asyncio.gather(*(_scheduled_capture(a.name) for a in accounts.all_accounts()))
+
+
+async def _scheduled_capture(account: str) -> None:
+    # Planned before the capture run: days it captures fresh need no re-check today
+    planned = await run_io(plan, account)
+    if not planned["due"] and not planned["recheck"]:
+        print(f"[scheduler] {account}: nothing due — browser not started")
+        return
+
+    if planned["due"]:
+        job_id = await coordinator.run("scheduled", planned["due"], account=account)
+        await _schedule_empty_followup(account, job_id)
+    if planned["recheck"]:
+        await coordinator.run("recheck", planned["recheck"], force=True, account=account)
+
+
+async def _schedule_empty_followup(account: str, job_id: str) -> None:
+    """Recent days that came back empty often get their transactions posted later the
+    same day; look at them once more after EMPTY_FOLLOWUP_HOURS."""
+    if config.EMPTY_FOLLOWUP_HOURS <= 0:
+        return
+    cutoff = (date.today() - timedelta(days=config.EMPTY_RECHECK_DAYS)).isoformat()
+    _, entries = await run_io(store.list_captures, limit=500, job_id=job_id, status="empty")
+    dates = sorted({e["date"] for e in entries if e["date"] >= cutoff})
+    if not dates:
+        return
+    run_at = datetime.now() + timedelta(hours=config.EMPTY_FOLLOWUP_HOURS)
+    scheduler.add_job(
+        followup_capture,
+        trigger="date",
+        run_date=run_at,
+        args=[dates, account],
+        id=_followup_job_id(account),
+        replace_existing=True,
+    )
+    print(f"[scheduler] {account}: follow-up for {len(dates)} empty day(s) at {run_at:%Y-%m-%d %H:%M}")
+
+
+async def followup_capture(dates: list[str], account: Optional[str] = None) -> None:
+    # Skip the ones captured in the meantime (e.g. by a manual refresh)
+    manifest = manifest_for(account)
+    pending = [date.fromisoformat(d) for d in dates if not manifest.get(d)]
+    if pending:
+        await coordinator.run("followup", pending, account=account)
+
+
+def _run_time(job_id: str) -> Optional[str]:
+    job = scheduler.get_job(job_id) if scheduler.running else None
+    if job is None or job.next_run_time is None:
+        return None
+    return job.next_run_time.isoformat(timespec="seconds")
+
+
+def status(account: Optional[str] = None) -> dict:
+    """Next scheduled run and the dates it would capture for `account` if it ran now."""
+    account = accounts.get(account).name
+    planned = plan(account)
+    followup_id = _followup_job_id(account)
+    followup = scheduler.get_job(followup_id) if scheduler.running else None
+    return {
+        "account": account,
+        "next_run": _run_time("daily_capture"),
+        "due": [d.isoformat() for d in planned["due"]],
+        "recheck": [d.isoformat() for d in planned["recheck"]],
+        "followup": {
+            "run_at": _run_time(followup_id),
+            "dates": followup.args[0] if followup else [],
+        },
+    }
 
 
 def start(schedule_hour: int) -> None:
@@ -41,6 +165,7 @@ def start(schedule_hour: int) -> None:
     scheduler.start()
 
 
-def stop() -> None:
+async def stop() -> None:
     if scheduler.running:
         scheduler.shutdown(wait=False)
+    await browser.pool.stop()
@@ -1,55 +1,52 @@
 import asyncio
-import json
-from datetime import date, timedelta
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import date
 from pathlib import Path
 from typing import Callable, Optional
 
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import BrowserContext, Frame, Page, Request, TimeoutError as PlaywrightTimeoutError
 
-from . import config
+from . import accounts, blocking, browser, config, diskio, events, fastlookup, imaging, metrics, receipts, resilience
+from .accounts import Account
+from .manifest import Manifest, manifest_for, receipt_filename
+from .jobs import last_n_days
+from .store import store
+from .throttle import RateLimiter
 
-CHROMIUM_ARGS = [
-    "--no-sandbox",
-    "--disable-gpu",
-    "--disable-dev-shm-usage",
-    "--disable-extensions",
-    "--disable-background-timer-throttling",
-    "--disable-renderer-backgrounding",
-    "--disable-backgrounding-occluded-windows",
-    "--disable-features=TranslateUI",
-]
+VIEWPORT = {"width": 1024, "height": 768}
 
-_LOG_LIMIT = 20
-_LOG_FILE = config.SCREENSHOTS_DIR / "capture_log.json"
+# Shared by every worker of every job: at most one lookup per CAPTURE_COOLDOWN seconds
+_lookup_limiter = RateLimiter(config.CAPTURE_COOLDOWN, config.CAPTURE_MAX_COOLDOWN)
+metrics.LOOKUP_INTERVAL.set_function(lambda: _lookup_limiter.interval)
 
+# Lookup request learned per account for the HTTP fast path, kept across jobs
+_lookup_templates: dict[str, fastlookup.LookupTemplate] = {}
+# Unrecognised fast-path responses in a row before the learned request is dropped
+_FAST_PATH_MAX_MISSES = 2
 
-def _load_logs() -> list[dict]:
-    try:
-        if _LOG_FILE.exists():
-            return json.loads(_LOG_FILE.read_text(encoding="utf-8"))
-    except Exception:
-        pass
-    return []
 
+class _JobLog:
+    """Log entries of one capture job — persisted to the store and returned to the caller."""
 
-# Persistent rolling log — loaded from disk on startup, trimmed to _LOG_LIMIT entries
-capture_logs: list[dict] = _load_logs()
+    def __init__(self, job_id: Optional[str], account: Account):
+        self.job_id = job_id
+        self.account = account
+        self.entries: list[dict] = []
 
-
-def _append_log(entry: dict) -> None:
-    capture_logs.append(entry)
-    if len(capture_logs) > _LOG_LIMIT:
-        del capture_logs[:-_LOG_LIMIT]
-    try:
-        _LOG_FILE.write_text(
-            json.dumps(capture_logs, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
-    except Exception:
-        pass
+    def append(self, entry: dict) -> None:
+        entry["account"] = self.account.name
+        self.entries.append(entry)
+        metrics.CAPTURES.labels(entry["status"]).inc()
+        # Queued, in order, on the writer thread; the job's finish_job lands after it
+        diskio.queue_write(store.add_capture, entry, self.job_id)
+        events.hub.publish(self.job_id, {"type": "result", **entry})
 
 
 async def login(page: Page, user_id: str, password: str) -> None:
-    await page.goto("https://www.hipass.co.kr/comm/lginpg.do", timeout=60000)
+    await page.goto(f"{config.HIPASS_BASE_URL}/comm/lginpg.do", timeout=60000)
 
     try:
         await page.wait_for_load_state("networkidle", timeout=8000)
@@ -101,13 +98,13 @@ async def login(page: Page, user_id: str, password: str) -> None:
 
     # Verify login succeeded — login page URL contains 'lginpg'
     if "lginpg" in page.url:
-        raise RuntimeError(
+        raise resilience.LoginRejected(
             f"로그인 실패 — 로그인 페이지에 머물러 있음 (자격증명 또는 보안문자 확인 필요). URL: {page.url}"
         )
 
 
 async def navigate_to_lookup(page: Page, ecd_no: str) -> None:
-    await page.goto("https://www.hipass.co.kr/usepculr/InitUsePculrTabSearch.do", timeout=60000)
+    await page.goto(f"{config.HIPASS_BASE_URL}/usepculr/InitUsePculrTabSearch.do", timeout=60000)
 
     try:
         await page.wait_for_load_state("networkidle", timeout=10000)
@@ -121,6 +118,122 @@ async def navigate_to_lookup(page: Page, ecd_no: str) -> None:
             pass
 
 
+async def _is_logged_out(page: Page) -> bool:
+    # An expired session can also surface inside the if_main_post result frame
+    if any("lginpg" in frame.url for frame in page.frames):
+        return True
+    try:
+        return await page.query_selector("#per_user_id") is not None
+    except Exception:
+        return False
+
+
+def _context_options(account: Account) -> dict:
+    """BrowserContext kwargs — seeds the context with the account's saved session if there is one."""
+    options = {"viewport": VIEWPORT, "device_scale_factor": config.RENDER_DEVICE_SCALE}
+    if account.session_file.exists():
+        options["storage_state"] = str(account.session_file)
+    return options
+
+
+@asynccontextmanager
+async def _open_context(account: Account):
+    """Pooled context with the account's saved session and request blocking installed.
+    Each job gets its own context, so accounts never share cookies."""
+    async with browser.pool.context(**_context_options(account)) as context:
+        await blocking.install(context)
+        yield context
+
+
+def _discard_session(account: Account) -> None:
+    try:
+        account.session_file.unlink(missing_ok=True)
+    except Exception:
+        pass
+
+
+async def open_session(page: Page, account: Account) -> None:
+    """Leave `page` on the account's lookup form, logged in.
+
+    A context seeded from the saved storage state is validated by loading the
+    lookup page; only when HiPass bounces us to the login page does the full
+    keystroke login run, after which the fresh state is saved for the next job."""
+    events.step("", "session")
+    if account.session_file.exists():
+        with metrics.span("navigate"):
+            await navigate_to_lookup(page, account.ecd_no)
+        if not await _is_logged_out(page):
+            print("[scraper] saved session still valid — login skipped")
+            return
+        print("[scraper] saved session expired — logging in")
+
+    events.step("", "login")
+    try:
+        with metrics.span("login"):
+            await login(page, account.user_id, account.password)
+    except Exception:
+        _discard_session(account)
+        raise
+    with metrics.span("navigate"):
+        await navigate_to_lookup(page, account.ecd_no)
+
+    try:
+        await page.context.storage_state(path=str(account.session_file))
+        account.session_file.chmod(0o600)
+    except Exception as e:
+        print(f"[scraper] could not save session state: {e}")
+
+
+async def _open_session_with_retry(page: Page, account: Account) -> None:
+    """open_session with backoff between attempts; rejected credentials are not retried."""
+    attempt = 0
+    while True:
+        attempt += 1
+        probe = await resilience.breaker.wait()
+        try:
+            await open_session(page, account)
+        except Exception as e:
+            kind = resilience.classify(e)
+            metrics.RETRIES.labels(f"login_{kind}").inc()
+            if kind == "auth" or attempt >= config.CAPTURE_MAX_ATTEMPTS:
+                resilience.breaker.release(probe)
+                raise
+            resilience.breaker.record_failure()
+            delay = resilience.backoff_delay(attempt)
+            print(f"[scraper] {account.name}: login attempt {attempt} failed ({kind}): {e} — retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            resilience.breaker.release(probe)
+            raise
+        resilience.breaker.record_success()
+        return
+
+
+class _Session:
+    """Login state shared by the pages of one context, plus the account it belongs to.
+
+    When several workers notice the same expiry, only the first logs in again;
+    the others see the generation has moved on and just reload the lookup form."""
+
+    def __init__(self, account: Account):
+        self.account = account
+        self.manifest: Manifest = manifest_for(account.name)
+        self.generation = 0
+        self._lock = asyncio.Lock()
+
+    async def recover(self, page: Page, seen_generation: int) -> None:
+        async with self._lock:
+            if self.generation == seen_generation:
+                print(f"[scraper] {self.account.name}: session lost mid-run — logging in again")
+                _discard_session(self.account)
+                await _open_session_with_retry(page, self.account)
+                self.generation += 1
+                return
+        with metrics.span("navigate"):
+            await navigate_to_lookup(page, self.account.ecd_no)
+
+
 async def _find_form_frame(page: Page):
     """Return the frame (or main page) that contains #sDate_view.
     HiPass may embed the search form inside an iframe."""
@@ -142,71 +255,175 @@ async def _find_form_frame(page: Page):
     return page  # fall back to main page
 
 
+async def submit_lookup(
+    page: Page, start: date, end: date, timings: Optional[dict] = None
+) -> Optional[Frame]:
+    """Run a lookup for start..end (inclusive) and return the loaded if_main_post frame."""
+    label = start.isoformat() if start == end else f"{start.isoformat()}~{end.isoformat()}"
+    started = time.perf_counter()
+    with metrics.span("find_form"):
+        form = await _find_form_frame(page)
+    print(f"[scraper] {label}: form frame = {getattr(form, 'url', 'main_page')!r}")
+
+    # #sDate_view / #eDate_view are display-only fields.
+    # #sDate / #eDate are the hidden inputs actually used for the query (YYYYMMDD format).
+    await form.evaluate(
+        """([sView, eView, sHidden, eHidden]) => {
+            const s = document.querySelector('#sDate_view');
+            const e = document.querySelector('#eDate_view');
+            const sH = document.querySelector('#sDate');
+            const eH = document.querySelector('#eDate');
+            if (s) { s.value = sView; s.dispatchEvent(new Event('change', {bubbles: true})); }
+            if (e) { e.value = eView; e.dispatchEvent(new Event('change', {bubbles: true})); }
+            if (sH) { sH.value = sHidden; sH.dispatchEvent(new Event('change', {bubbles: true})); }
+            if (eH) { eH.value = eHidden; eH.dispatchEvent(new Event('change', {bubbles: true})); }
+        }""",
+        [
+            start.strftime("%Y-%m-%d"),
+            end.strftime("%Y-%m-%d"),
+            start.strftime("%Y%m%d"),
+            end.strftime("%Y%m%d"),
+        ],
+    )
+    print(f"[scraper] {label}: dates set")
+
+    await form.wait_for_selector("#lookupBtn a", timeout=5000)
+    started = _mark(timings, "form", started)
+
+    # Wait for the result iframe to actually navigate instead of sleeping: the
+    # frame's load state is reset on commit, so the load wait below can no longer
+    # return early with the state left over from the previous lookup.
+    try:
+        async with page.expect_event(
+            "framenavigated",
+            predicate=lambda f: f.name == "if_main_post",
+            timeout=15000,
+        ):
+            await form.click("#lookupBtn a")
+    except PlaywrightTimeoutError:
+        print(f"[scraper] {label}: if_main_post did not navigate after lookup")
+    print(f"[scraper] {label}: lookup clicked")
+
+    frame = page.frame(name="if_main_post")
+    if frame is None:
+        print(f"[scraper] {label}: if_main_post not found")
+        return None
+
+    try:
+        await frame.wait_for_load_state("load", timeout=15000)
+    except Exception:
+        pass
+    _mark(timings, "lookup", started)
+    return frame
+
+
+async def scan_range(page: Page, start: date, end: date) -> Optional[set[date]]:
+    """One lookup over start..end; returns the days that have transactions.
+
+    Returns None when the result table cannot be interpreted (no recognisable rows
+    although receipts exist, or the result is paginated) — callers must then fall
+    back to per-day lookups rather than treat days as empty."""
+    frame = await submit_lookup(page, start, end)
+    if frame is None:
+        return None
+
+    try:
+        await frame.wait_for_selector("#billAll", timeout=10000)
+    except Exception:
+        # Same signal capture_date uses for "no data": nothing to print in the window
+        print(f"[scraper] {start}~{end}: #billAll not found — no transactions in range")
+        return set()
+
+    scan = await frame.evaluate(
+        """() => ({
+            rows: Array.from(document.querySelectorAll('table tbody tr'))
+                .map(tr => tr.innerText),
+            pages: document.querySelectorAll(
+                '.paging a, .pagination a, .page_num a, [class*="paging"] a'
+            ).length,
+        })"""
+    )
+    if scan["pages"] > 1:
+        print(f"[scraper] {start}~{end}: result table is paginated — falling back to per-day lookups")
+        return None
+
+    found: set[date] = set()
+    for row in scan["rows"]:
+        for y, m, d in fastlookup.DATE_RE.findall(row):
+            try:
+                day = date(int(y), int(m), int(d))
+            except ValueError:
+                continue
+            if start <= day <= end:
+                found.add(day)
+
+    if not found:
+        print(f"[scraper] {start}~{end}: no dates recognised in result table — falling back")
+        return None
+    print(f"[scraper] {start}~{end}: {len(found)} day(s) with transactions")
+    return found
+
+
+def _split_windows(dates: list[date], max_days: int) -> list[tuple[date, date]]:
+    """Group sorted dates into contiguous lookup windows spanning at most max_days."""
+    windows: list[tuple[date, date]] = []
+    for day in sorted(dates):
+        if windows and (day - windows[-1][0]).days < max_days:
+            windows[-1] = (windows[-1][0], day)
+        else:
+            windows.append((day, day))
+    return windows
+
+
+def _mark(timings: Optional[dict], step: str, started: float) -> float:
+    """Record the time spent in `step` since `started`; returns the new start time."""
+    now = time.perf_counter()
+    metrics.observe(step, now - started, timings)
+    return now
+
+
 async def capture_date(
-    page: Page, target_date: date, output_dir: Path
+    page: Page,
+    target_date: date,
+    output_dir: Path,
+    timings: Optional[dict] = None,
+    receipt: Optional[dict] = None,
 ) -> Optional[str]:
+    """Look up `target_date` and screenshot its receipt popup into `output_dir`.
+
+    Returns the filename, or None when the date has no receipts. Per-step latencies
+    (ms) are written into `timings` when a dict is passed; the popup's text content
+    and table cells are written into `receipt` ("text", "rows") when a dict is passed."""
     date_str = target_date.strftime("%Y-%m-%d")
-    alert_fired = False
+    no_data = asyncio.Event()
+    popup_opened = asyncio.Event()
+    popups: list[Page] = []
 
     def on_dialog(dialog):
-        nonlocal alert_fired
         msg = dialog.message.lower() if dialog.message else ""
         print(f"[scraper] dialog: type={dialog.type!r}, message={dialog.message!r}")
         if dialog.type == "alert" and ("없습니다" in msg or "없음" in msg):
             # "출력할 영수증 데이터가 없습니다." — genuine no-data alert
-            alert_fired = True
+            no_data.set()
             asyncio.ensure_future(dialog.dismiss())
         else:
             # confirm() asking to print receipt → accept so the popup window opens
             asyncio.ensure_future(dialog.accept())
 
+    def on_popup(popup: Page):
+        # Page-scoped "popup" rather than context.pages[-1]: other workers open
+        # their own popups in the same context.
+        popups.append(popup)
+        popup_opened.set()
+
     page.on("dialog", on_dialog)
+    page.on("popup", on_popup)
     try:
-        form = await _find_form_frame(page)
-        print(f"[scraper] {date_str}: form frame = {getattr(form, 'url', 'main_page')!r}")
-
-        # #sDate_view / #eDate_view are display-only fields.
-        # #sDate / #eDate are the hidden inputs actually used for the query (YYYYMMDD format).
-        date_hidden = target_date.strftime("%Y%m%d")
-        await form.evaluate(
-            """([dateStr, dateHidden]) => {
-                const s = document.querySelector('#sDate_view');
-                const e = document.querySelector('#eDate_view');
-                const sH = document.querySelector('#sDate');
-                const eH = document.querySelector('#eDate');
-                if (s) { s.value = dateStr; s.dispatchEvent(new Event('change', {bubbles: true})); }
-                if (e) { e.value = dateStr; e.dispatchEvent(new Event('change', {bubbles: true})); }
-                if (sH) { sH.value = dateHidden; sH.dispatchEvent(new Event('change', {bubbles: true})); }
-                if (eH) { eH.value = dateHidden; eH.dispatchEvent(new Event('change', {bubbles: true})); }
-            }""",
-            [date_str, date_hidden],
-        )
-        print(f"[scraper] {date_str}: date set → view={date_str}, hidden={date_hidden}")
-
-        await form.wait_for_selector("#lookupBtn a", timeout=5000)
-        await form.click("#lookupBtn a")
-        print(f"[scraper] {date_str}: lookup clicked")
-
-        # Give the iframe navigation time to actually start before waiting.
-        # Using 1.5s here because wait_for_load_state("load") returns immediately
-        # if the frame is already in "loaded" state from its previous navigation.
-        await asyncio.sleep(1.5)
-
-        frame = page.frame(name="if_main_post")
-        if frame is None:
-            print(f"[scraper] {date_str}: if_main_post not found (step 1)")
-            return None
-
-        try:
-            await frame.wait_for_load_state("load", timeout=15000)
-        except Exception:
-            pass
-
-        # Re-acquire after load to ensure we have the current JS context
-        frame = page.frame(name="if_main_post")
+        events.step(date_str, "lookup")
+        frame = await submit_lookup(page, target_date, target_date, timings)
         if frame is None:
-            print(f"[scraper] {date_str}: if_main_post not found (step 2)")
             return None
+        started = time.perf_counter()
 
         popup_btn_selector = "#billAll"
         try:
@@ -215,29 +432,47 @@ async def capture_date(
         except Exception:
             print(f"[scraper] {date_str}: #billAll not found — no data or iframe still loading")
             return None
+        started = _mark(timings, "results", started)
 
         print(f"[scraper] {date_str}: #billAll found, clicking")
         await frame.eval_on_selector(popup_btn_selector, "el => el.scrollIntoView()")
 
-        # Reset alert_fired here — a prior lookup phase alert (e.g. session warning)
-        # must not be mistaken for a "no receipt data" alert from #billAll itself.
-        alert_fired = False
+        # Reset here — a prior lookup phase alert (e.g. session warning) must not be
+        # mistaken for a "no receipt data" alert from #billAll itself.
+        no_data.clear()
+        popup_opened.clear()
+        popups.clear()
         await frame.eval_on_selector(popup_btn_selector, "el => el.click()")
-        await asyncio.sleep(0.8)  # give alert/popup time to appear
 
-        if alert_fired:
+        # Whichever comes first: the no-data alert or the receipt popup window
+        waiters = [
+            asyncio.ensure_future(no_data.wait()),
+            asyncio.ensure_future(popup_opened.wait()),
+        ]
+        try:
+            await asyncio.wait(waiters, timeout=10, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        started = _mark(timings, "popup", started)
+
+        if no_data.is_set():
             # "출력할 영수증 데이터가 없습니다." — no receipt data for this date
             print(f"[scraper] {date_str}: alert fired after #billAll — no receipt data")
             return None
 
-        # No alert fired — detect the new popup window via context.pages
-        pages = page.context.pages
-        popup = pages[-1] if len(pages) > 1 and pages[-1] != page else None
+        popup = popups[-1] if popups else None
         if popup is None:
             print(f"[scraper] {date_str}: popup window not detected (pages={len(page.context.pages)})")
             return None
 
         print(f"[scraper] {date_str}: popup detected, capturing .popup_content")
+        events.step(date_str, "popup")
+        if config.RENDER_POPUP_WIDTH > 0:
+            await popup.set_viewport_size({
+                "width": config.RENDER_POPUP_WIDTH,
+                "height": config.RENDER_POPUP_HEIGHT or VIEWPORT["height"],
+            })
         await popup.wait_for_selector(".popup_content", timeout=10000)
         popup_content = await popup.query_selector(".popup_content")
 
@@ -245,10 +480,19 @@ async def capture_date(
             print(f"[scraper] {date_str}: .popup_content not found in popup")
             await popup.close()
             return None
-
-        filename = f"하이패스({date_str}).png"
-        await popup_content.screenshot(path=str(output_dir / filename))
+        started = _mark(timings, "render", started)
+        if receipt is not None:
+            receipt.update(await popup_content.evaluate(receipts.EXTRACT_JS))
+
+        filename = receipt_filename(date_str)
+        await _screenshot_receipt(popup, popup_content, output_dir / filename)
+        _mark(timings, "screenshot", started)
+        saved = await diskio.run_io((output_dir / filename).stat)
+        metrics.BYTES_WRITTEN.inc(saved.st_size)
         print(f"[scraper] {date_str}: screenshot saved → {filename}")
+        events.step(date_str, "saved", filename=filename)
+        if timings:
+            print(f"[scraper] {date_str}: timings(ms) {timings}")
 
         try:
             await popup.close()
@@ -261,145 +505,492 @@ async def capture_date(
         raise
     finally:
         page.remove_listener("dialog", on_dialog)
+        page.remove_listener("popup", on_popup)
+
+
+# Page coordinates of an element — what page.screenshot(clip=..., full_page=True) expects
+_PAGE_RECT_JS = """el => {
+    const r = el.getBoundingClientRect();
+    return {x: r.left + window.scrollX, y: r.top + window.scrollY,
+            width: Math.ceil(r.width), height: Math.ceil(r.height)};
+}"""
+
+
+async def _screenshot_receipt(popup: Page, element, path: Path) -> None:
+    """Screenshot the receipt element into `path` with the RENDER_* settings."""
+    options = {
+        "path": str(path),
+        "animations": "disabled" if config.RENDER_DISABLE_ANIMATIONS else "allow",
+        "caret": "hide" if config.RENDER_HIDE_CARET else "initial",
+    }
+    if config.RENDER_CLIP:
+        # One layout read, then a plain page screenshot of that rectangle
+        clip = await element.evaluate(_PAGE_RECT_JS)
+        await popup.screenshot(clip=clip, full_page=True, **options)
+    else:
+        await element.screenshot(**options)
 
 
 async def capture_single_date_standalone(
     target_date: date,
     progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    job_id: Optional[str] = None,
+    force: bool = False,
+    account: Optional[str] = None,
 ) -> list[dict]:
-    """Full Playwright session for a single date. Used for one-off captures and testing."""
-    date_str = target_date.strftime("%Y-%m-%d")
+    """Capture one date outside the coordinator, for one-off captures and testing."""
+    return await capture_dates(
+        [target_date], progress_callback=progress_callback, job_id=job_id, force=force, account=account
+    )
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
-        page = await browser.new_page(viewport={"width": 1024, "height": 768})
 
-        try:
-            await login(page, config.HIPASS_ID, config.HIPASS_PW)
-            await navigate_to_lookup(page, config.ECD_NO)
-        except Exception as e:
-            await browser.close()
-            _append_log({
-                "date": date_str,
-                "status": "error",
-                "message": f"로그인 실패: {e}",
-                "timestamp": _now_iso(),
-            })
-            return capture_logs
+async def capture_last_n_days(
+    n: int = 14,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    job_id: Optional[str] = None,
+) -> list[dict]:
+    return await capture_dates(last_n_days(n), progress_callback=progress_callback, job_id=job_id)
 
-        filename = f"하이패스({date_str}).png"
-        output_path = config.SCREENSHOTS_DIR / filename
 
-        if output_path.exists():
-            _append_log({
+async def capture_dates(
+    dates: list[date],
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    job_id: Optional[str] = None,
+    force: bool = False,
+    account: Optional[str] = None,
+) -> list[dict]:
+    """Capture `dates` of `account` (default: the first configured one) with up to
+    CAPTURE_CONCURRENCY pages sharing one logged-in context.
+
+    Dates are handed out from a shared queue, so log entries and progress callbacks
+    arrive in completion order; `done` in the callback is always the running count.
+    With `force`, dates that already have a receipt are re-captured and the stored
+    file is replaced only if the receipt changed."""
+    with events.job_scope(job_id):
+        return await _capture_dates(dates, progress_callback, job_id, force, accounts.get(account))
+
+
+async def _capture_dates(
+    dates: list[date],
+    progress_callback: Optional[Callable[[int, int, str], None]],
+    job_id: Optional[str],
+    force: bool,
+    account: Account,
+) -> list[dict]:
+    await diskio.run_io(accounts.ensure_dirs)
+    total = len(dates)
+    log = _JobLog(job_id, account)
+    manifest = manifest_for(account.name)
+    done = 0
+
+    def report(date_str: str) -> None:
+        nonlocal done
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, date_str)
+
+    # Already-captured dates are settled from the manifest before any browser work,
+    # so a job with nothing left to do never opens a context or logs in.
+    missing = []
+    for target_date in dates:
+        date_str = target_date.strftime("%Y-%m-%d")
+        if manifest.get(date_str) and not force:
+            log.append({
                 "date": date_str,
                 "status": "skipped",
                 "message": "이미 존재함",
                 "timestamp": _now_iso(),
             })
+            report(date_str)
         else:
-            try:
-                result = await capture_date(page, target_date, config.SCREENSHOTS_DIR)
-                _append_log({
-                    "date": date_str,
-                    "status": "success" if result else "empty",
-                    "message": "캡처 완료" if result else "통행 기록 없음",
-                    "timestamp": _now_iso(),
-                })
-            except Exception as e:
-                _append_log({
-                    "date": date_str,
-                    "status": "error",
-                    "message": str(e),
-                    "timestamp": _now_iso(),
-                })
+            missing.append(target_date)
+    if not missing:
+        return log.entries
 
-        if progress_callback:
-            progress_callback(1, 1, date_str)
+    # Don't hold a browser context while the site is known to be down. The probe is
+    # left to the login / lookup attempts, which report its outcome.
+    await resilience.breaker.wait(probe=False)
+    async with _open_context(account) as context:
+        page = await context.new_page()
 
-        await browser.close()
+        try:
+            await _open_session_with_retry(page, account)
+        except Exception as e:
+            log.append({
+                "date": date.today().isoformat(),
+                "status": "error",
+                "message": f"로그인 실패: {e}",
+                "timestamp": _now_iso(),
+            })
+            return log.entries
+
+        session = _Session(account)
+        pending = missing
+        if config.CAPTURE_RANGE_MODE:
+            pending = await _prefilter_by_range(page, missing, log, report)
+        if config.HTTP_FAST_PATH:
+            pending = await _prefilter_by_http(page, session, pending, log, report)
+
+        queue: asyncio.Queue[date] = asyncio.Queue()
+        for target_date in pending:
+            queue.put_nowait(target_date)
+
+        async def worker(worker_id: int, worker_page: Optional[Page]) -> None:
+            if worker_page is None:
+                # Extra workers get their own tab; cookies come from the shared context
+                try:
+                    worker_page = await context.new_page()
+                    with metrics.span("navigate"):
+                        await navigate_to_lookup(worker_page, account.ecd_no)
+                except Exception as e:
+                    print(f"[scraper] worker {worker_id}: could not open lookup page: {e}")
+                    return
+
+            while not queue.empty():
+                target_date = queue.get_nowait()
+                date_str = target_date.strftime("%Y-%m-%d")
+                entry = await _capture_one(worker_page, target_date, session, force)
+                log.append(entry)
+                report(date_str)
+
+        workers = max(1, min(config.CAPTURE_CONCURRENCY, len(pending)))
+        await asyncio.gather(
+            *(worker(i, page if i == 0 else None) for i in range(workers))
+        )
 
-    return capture_logs
+    return log.entries
 
 
-async def capture_last_n_days(
-    n: int = 14,
-    progress_callback: Optional[Callable[[int, int, str], None]] = None,
-) -> list[dict]:
-    today = date.today()
-    # HiPass registers yesterday's receipts today, so start from yesterday
-    dates = [today - timedelta(days=i) for i in range(1, n + 1)]
+async def _prefilter_by_range(
+    page: Page, missing: list[date], log: _JobLog, report: Callable[[str], None]
+) -> list[date]:
+    """Range mode: resolve empty days with a few wide lookups instead of one per day.
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
-        page = await browser.new_page(viewport={"width": 1024, "height": 768})
+    Days the range lookup shows no transactions for are logged as empty; only the
+    remaining days are returned for per-day receipt capture."""
+    if len(missing) < 2:
+        return missing
 
+    pending = []
+    for start, end in _split_windows(missing, config.RANGE_LOOKUP_MAX_DAYS):
+        window = [d for d in missing if start <= d <= end]
+        await _lookup_limiter.acquire()
         try:
-            await login(page, config.HIPASS_ID, config.HIPASS_PW)
-            await navigate_to_lookup(page, config.ECD_NO)
+            active = await scan_range(page, start, end)
         except Exception as e:
-            await browser.close()
-            _append_log({
-                "date": today.isoformat(),
-                "status": "error",
-                "message": f"로그인 실패: {e}",
+            print(f"[scraper] {start}~{end}: range lookup failed: {e}")
+            active = None
+        if active is None:
+            pending.extend(window)
+            continue
+        for target_date in window:
+            if target_date in active:
+                pending.append(target_date)
+                continue
+            date_str = target_date.strftime("%Y-%m-%d")
+            log.append({
+                "date": date_str,
+                "status": "empty",
+                "message": "통행 기록 없음 (기간 조회)",
                 "timestamp": _now_iso(),
             })
-            return capture_logs
+            report(date_str)
+    return pending
 
-        for idx, target_date in enumerate(dates):
-            date_str = target_date.strftime("%Y-%m-%d")
-            filename = f"하이패스({date_str}).png"
-            output_path = config.SCREENSHOTS_DIR / filename
 
-            if output_path.exists():
-                _append_log({
-                    "date": date_str,
-                    "status": "skipped",
-                    "message": "이미 존재함",
-                    "timestamp": _now_iso(),
-                })
-                if progress_callback:
-                    progress_callback(idx + 1, n, date_str)
-                continue
+async def _learn_lookup(page: Page, day: date) -> Optional[fastlookup.LookupTemplate]:
+    """Run one browser lookup and record the request it sends into if_main_post."""
+    sent: list[Request] = []
 
+    def on_request(request: Request) -> None:
+        try:
+            if request.is_navigation_request() and request.frame.name == "if_main_post":
+                sent.append(request)
+        except Exception:
+            pass
+
+    page.on("request", on_request)
+    try:
+        await submit_lookup(page, day, day)
+    finally:
+        page.remove_listener("request", on_request)
+    if not sent:
+        return None
+    request = sent[-1]
+    return fastlookup.LookupTemplate(
+        request.url, request.method, request.post_data, await request.all_headers(), day
+    )
+
+
+async def _http_lookup(context: BrowserContext, template: fastlookup.LookupTemplate, day: date) -> Optional[bool]:
+    """Replay the lookup for `day` without rendering; see fastlookup.classify for the result."""
+    url, body = template.build(day)
+    try:
+        with metrics.span("http_lookup"):
+            # The context's request client shares its cookie jar and keeps connections alive
+            response = await context.request.fetch(
+                url, method=template.method, data=body, headers=template.headers,
+                max_redirects=0, timeout=15000,
+            )
             try:
-                result = await capture_date(page, target_date, config.SCREENSHOTS_DIR)
-                if result:
-                    entry = {
-                        "date": date_str,
-                        "status": "success",
-                        "message": "캡처 완료",
-                        "timestamp": _now_iso(),
-                    }
+                # A redirect is the login page: let the browser path recover the session
+                if response.status != 200:
+                    return None
+                html = await response.text()
+            finally:
+                await response.dispose()
+    except Exception as e:
+        print(f"[scraper] {day}: fast lookup failed: {e}")
+        return None
+    return fastlookup.classify(html, day)
+
+
+async def _prefilter_by_http(
+    page: Page, session: "_Session", pending: list[date], log: _JobLog, report: Callable[[str], None]
+) -> list[date]:
+    """Fast path: settle days without transactions with plain HTTP lookups.
+
+    The lookup request is learned from one browser lookup per account. Days the
+    replayed lookup shows as empty are logged without any rendering; days with
+    transactions, days with a stored receipt (forced re-capture) and any response
+    we don't recognise go back to the browser path."""
+    account, manifest = session.account, session.manifest
+    fresh = [d for d in pending if not manifest.get(d.isoformat())]
+    if not fresh:
+        return pending
+
+    template = _lookup_templates.get(account.name)
+    if template is None:
+        await _lookup_limiter.acquire()
+        try:
+            template = await _learn_lookup(page, fresh[0])
+        except Exception as e:
+            print(f"[scraper] {account.name}: could not learn the lookup request: {e}")
+            template = None
+        if template is None or not template.usable():
+            print(f"[scraper] {account.name}: lookup request not replayable — fast path disabled for this job")
+            return pending
+        _lookup_templates[account.name] = template
+        print(f"[scraper] {account.name}: learned lookup request {template.method} {template.url.split('?')[0]}")
+
+    settled: set[date] = set()
+    misses = 0
+    slots = asyncio.Semaphore(max(1, config.CAPTURE_CONCURRENCY))
+
+    async def check(day: date) -> None:
+        nonlocal misses
+        if misses >= _FAST_PATH_MAX_MISSES:
+            metrics.FAST_LOOKUPS.labels("fallback").inc()
+            return
+        async with slots:
+            await _lookup_limiter.acquire()
+            has_data = await _http_lookup(page.context, template, day)
+        if has_data is None:
+            misses += 1
+            metrics.FAST_LOOKUPS.labels("fallback").inc()
+            return
+        misses = 0
+        if has_data:
+            metrics.FAST_LOOKUPS.labels("data").inc()
+            return
+        metrics.FAST_LOOKUPS.labels("empty").inc()
+        settled.add(day)
+        date_str = day.isoformat()
+        log.append({
+            "date": date_str,
+            "status": "empty",
+            "message": "통행 기록 없음 (HTTP 조회)",
+            "timestamp": _now_iso(),
+        })
+        report(date_str)
+
+    await asyncio.gather(*(check(d) for d in fresh))
+    if misses >= _FAST_PATH_MAX_MISSES:
+        # The site changed or the session is gone; learn the request again next job
+        _lookup_templates.pop(account.name, None)
+        print(f"[scraper] {account.name}: fast lookup responses not recognised — back to the browser path")
+    return [d for d in pending if d not in settled]
+
+
+async def _capture_one(page: Page, target_date: date, session: _Session, force: bool = False) -> dict:
+    """Capture a single date on an already logged-in lookup page and return its log entry.
+
+    Failed attempts are retried up to CAPTURE_MAX_ATTEMPTS times with backoff; an
+    expired session is recovered by logging in again (through `session`, shared by
+    the job's workers). Every outcome feeds the circuit breaker and the adaptive
+    lookup spacing."""
+    date_str = target_date.strftime("%Y-%m-%d")
+    account, manifest = session.account, session.manifest
+
+    existing = manifest.get(date_str)
+    if existing and not force:
+        return {
+            "date": date_str,
+            "status": "skipped",
+            "message": "이미 존재함",
+            "timestamp": _now_iso(),
+        }
+
+    timings: dict[str, int] = {}
+    receipt: dict = {}
+    started = time.perf_counter()
+    # A re-capture goes to the staging directory first and only replaces the
+    # stored receipt if its content changed
+    output_dir = account.staging_dir if existing else account.directory
+    await diskio.run_io(output_dir.mkdir, exist_ok=True)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        probe = await resilience.breaker.wait()
+        generation = session.generation
+        try:
+            await _lookup_limiter.acquire()
+            result = await capture_date(page, target_date, output_dir, timings, receipt)
+            if result is None and await _is_logged_out(page):
+                raise resilience.SessionExpired("조회 중 로그인 페이지로 이동됨")
+            break
+        except Exception as e:
+            kind = resilience.classify(e)
+            metrics.RETRIES.labels(kind).inc()
+            if kind != "session":
+                resilience.breaker.record_failure()
+                _lookup_limiter.slow_down()
+            # A lost session says nothing about the site; free the probe before the
+            # re-login below asks for one
+            resilience.breaker.release(probe)
+            final = attempt >= config.CAPTURE_MAX_ATTEMPTS
+            print(f"[scraper] {date_str}: attempt {attempt} failed ({kind}): {e}")
+
+            # Restore page state, for the next attempt or the next date
+            try:
+                if kind == "session":
+                    await session.recover(page, generation)
                 else:
-                    entry = {
-                        "date": date_str,
-                        "status": "empty",
-                        "message": "통행 기록 없음",
-                        "timestamp": _now_iso(),
-                    }
-            except Exception as e:
-                entry = {
+                    with metrics.span("navigate"):
+                        await navigate_to_lookup(page, account.ecd_no)
+            except Exception as recover_error:
+                print(f"[scraper] {date_str}: recovery failed: {recover_error}")
+
+            if final:
+                return {
                     "date": date_str,
                     "status": "error",
-                    "message": str(e),
+                    "message": f"{e} ({kind}, {attempt}회 시도)",
                     "timestamp": _now_iso(),
+                    "duration_ms": round((time.perf_counter() - started) * 1000),
+                    "timings": timings,
                 }
-                # Try to recover page state so subsequent dates can still be captured
-                try:
-                    await navigate_to_lookup(page, config.ECD_NO)
-                except Exception:
-                    pass
-
-            _append_log(entry)
-            if progress_callback:
-                progress_callback(idx + 1, n, date_str)
-            await asyncio.sleep(config.CAPTURE_COOLDOWN)
-
-        await browser.close()
-
-    return capture_logs
+            if kind != "session":
+                events.step(date_str, "retry", attempt=attempt)
+                await asyncio.sleep(resilience.backoff_delay(attempt))
+            timings.clear()
+            receipt.clear()
+        except BaseException:
+            resilience.breaker.release(probe)
+            raise
+
+    resilience.breaker.record_success()
+    _lookup_limiter.speed_up()
+
+    if result and existing:
+        try:
+            status, message = await _reconcile_recapture(session, date_str, result, receipt)
+        except Exception as e:
+            # Logged for this date only; the job's other workers carry on
+            print(f"[scraper] {date_str}: re-capture comparison failed: {e}")
+            status, message = "error", f"재캡처 비교 실패: {e}"
+    elif result:
+        processed = await imaging.process(manifest, date_str, timings)
+        await manifest.add(result)
+        if processed:
+            try:
+                await diskio.run_io(
+                    store.add_revision,
+                    date_str, processed["pixel_hash"], _text_hash(receipt), True, events.current_job.get(),
+                    account.name,
+                )
+            except Exception as e:
+                print(f"[scraper] {date_str}: revision not recorded: {e}")
+        await _save_receipt_rows(account, date_str, receipt)
+        status, message = "success", "캡처 완료"
+    elif existing:
+        status, message = "empty", "통행 기록 없음 (기존 영수증 유지)"
+    else:
+        status, message = "empty", "통행 기록 없음"
+    return {
+        "date": date_str,
+        "status": status,
+        "message": message,
+        "timestamp": _now_iso(),
+        "duration_ms": round((time.perf_counter() - started) * 1000),
+        "timings": timings,
+    }
+
+
+async def _save_receipt_rows(account: Account, date_str: str, receipt: dict) -> None:
+    """Store the receipt's transaction rows. Failures are logged, never raised — the
+    receipt image is already saved and the capture stands either way."""
+    if "rows" not in receipt:
+        return
+    try:
+        rows = receipts.parse_rows(receipt["rows"], date_str)
+        await diskio.run_io(store.replace_receipts, date_str, rows, events.current_job.get(), account.name)
+    except Exception as e:
+        print(f"[scraper] {date_str}: receipt rows not saved: {e}")
+        return
+    if not rows:
+        print(f"[scraper] {date_str}: no transaction rows recognised in the receipt")
+
+
+def _text_hash(receipt: dict) -> Optional[str]:
+    text = receipt.get("text")
+    if not text:
+        return None
+    # Whitespace differences are layout noise, not receipt changes
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()[:16]
+
+
+async def _reconcile_recapture(
+    session: _Session, date_str: str, filename: str, receipt: dict
+) -> tuple[str, str]:
+    """Compare a staged re-capture with the stored receipt; replace it only if it changed.
+
+    Receipt text decides when both sides have it — it ignores anti-aliasing noise
+    between Chromium versions; otherwise the pixel hashes are compared."""
+    account, manifest = session.account, session.manifest
+    staged = account.staging_dir / filename
+    current = account.directory / filename
+    new_image = await imaging.content_hash(staged)
+    new_text = _text_hash(receipt)
+
+    previous = await diskio.run_io(store.latest_revision, date_str, account.name)
+    old_text = previous["text_hash"] if previous else None
+    if previous and previous["image_hash"]:
+        old_image = previous["image_hash"]
+    else:
+        # Captured before revisions were recorded
+        old_image = await imaging.content_hash(current)
+
+    if new_text and old_text:
+        changed = new_text != old_text
+    else:
+        changed = new_image != old_image
+
+    if changed:
+        await diskio.run_io(os.replace, staged, current)
+        await imaging.process(manifest, date_str)
+        await manifest.add(filename)
+        await _save_receipt_rows(account, date_str, receipt)
+    else:
+        await diskio.run_io(staged.unlink, missing_ok=True)
+    revision = await diskio.run_io(
+        store.add_revision, date_str, new_image, new_text, changed, events.current_job.get(), account.name
+    )
+    if changed:
+        print(f"[scraper] {account.name} {date_str}: receipt changed — replaced (rev {revision})")
+        return "updated", f"변경됨 — 교체 (rev {revision})"
+    return "unchanged", f"변경 없음 (rev {revision})"
 
 
 def _now_iso() -> str:
@@ -0,0 +1,620 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from . import config
+from .accounts import DEFAULT_ACCOUNT
+
+_DB_FILE = config.SCREENSHOTS_DIR / "hipass.db"
+# Pre-SQLite rolling log, imported once into an empty database
+_LEGACY_LOG_FILE = config.SCREENSHOTS_DIR / "capture_log.json"
+
+# Capture rows are buffered and written in one transaction per batch;
+# every read flushes first so the API never misses buffered rows.
+_BATCH_SIZE = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    account     TEXT NOT NULL DEFAULT 'default',
+    total       INTEGER NOT NULL DEFAULT 0,
+    done        INTEGER NOT NULL DEFAULT 0,
+    current_day TEXT NOT NULL DEFAULT '',
+    finished    INTEGER NOT NULL DEFAULT 0,
+    created_at  TEXT NOT NULL,
+    finished_at TEXT,
+    timings     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at);
+
+CREATE TABLE IF NOT EXISTS captures (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id      TEXT,
+    account     TEXT NOT NULL DEFAULT 'default',
+    date        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    message     TEXT NOT NULL DEFAULT '',
+    duration_ms INTEGER,
+    timings     TEXT,
+    timestamp   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_captures_date ON captures(date);
+CREATE INDEX IF NOT EXISTS idx_captures_job ON captures(job_id);
+CREATE INDEX IF NOT EXISTS idx_captures_status ON captures(status);
+
+CREATE TABLE IF NOT EXISTS revisions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    account     TEXT NOT NULL DEFAULT 'default',
+    date        TEXT NOT NULL,
+    revision    INTEGER NOT NULL,
+    image_hash  TEXT NOT NULL,
+    text_hash   TEXT,
+    changed     INTEGER NOT NULL,
+    job_id      TEXT,
+    created_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_revisions_date ON revisions(date, revision);
+
+CREATE TABLE IF NOT EXISTS receipts (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    account     TEXT NOT NULL DEFAULT 'default',
+    date        TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    passed_at   TEXT NOT NULL,
+    gate        TEXT NOT NULL DEFAULT '',
+    amount      INTEGER,
+    card        TEXT NOT NULL DEFAULT '',
+    cells       TEXT NOT NULL,
+    job_id      TEXT,
+    captured_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_receipts_date ON receipts(date, seq);
+
+CREATE TABLE IF NOT EXISTS backfills (
+    id          TEXT PRIMARY KEY,
+    account     TEXT NOT NULL,
+    start_date  TEXT NOT NULL,
+    end_date    TEXT NOT NULL,
+    force       INTEGER NOT NULL DEFAULT 0,
+    state       TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    finished_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS backfill_dates (
+    backfill_id TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    job_id      TEXT,
+    updated_at  TEXT,
+    PRIMARY KEY (backfill_id, date)
+);
+"""
+
+# Per-account indexes; created after _migrate so older databases have the column
+_ACCOUNT_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_account ON jobs(account, created_at);
+CREATE INDEX IF NOT EXISTS idx_captures_account ON captures(account, date);
+CREATE INDEX IF NOT EXISTS idx_revisions_account ON revisions(account, date, revision);
+CREATE INDEX IF NOT EXISTS idx_receipts_account ON receipts(account, date, seq);
+"""
+
+
+def _now_iso() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Store:
+    """SQLite (WAL) store for capture jobs and the per-date capture history.
+
+    Every row carries the account it belongs to (see app/accounts.py); rows from
+    before multi-account support belong to the default account."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._pending: list[tuple] = []
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _migrate(conn)
+            conn.executescript(_ACCOUNT_INDEXES)
+            self._conn = conn
+            self._import_legacy_log()
+        return self._conn
+
+    def _import_legacy_log(self) -> None:
+        if not _LEGACY_LOG_FILE.exists():
+            return
+        if self._conn.execute("SELECT 1 FROM captures LIMIT 1").fetchone():
+            return
+        try:
+            entries = json.loads(_LEGACY_LOG_FILE.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO captures (date, status, message, timestamp) VALUES (?, ?, ?, ?)",
+                [
+                    (e.get("date", ""), e.get("status", ""), e.get("message", ""), e.get("timestamp", ""))
+                    for e in entries
+                ],
+            )
+        print(f"[store] imported {len(entries)} entries from {_LEGACY_LOG_FILE.name}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    # ── captures ────────────────────────────────────────────────────────────
+
+    def add_capture(self, entry: dict, job_id: Optional[str] = None) -> None:
+        timings = entry.get("timings")
+        row = (
+            job_id,
+            entry.get("account") or DEFAULT_ACCOUNT,
+            entry["date"],
+            entry["status"],
+            entry.get("message", ""),
+            entry.get("duration_ms"),
+            json.dumps(timings) if timings else None,
+            entry.get("timestamp") or _now_iso(),
+        )
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= _BATCH_SIZE:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            db = self._db()
+            with db:
+                db.executemany(
+                    "INSERT INTO captures (job_id, account, date, status, message, duration_ms, timings, timestamp)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def list_captures(
+        self,
+        limit: int = 20,
+        offset: int = 0,
+        date: Optional[str] = None,
+        status: Optional[str] = None,
+        job_id: Optional[str] = None,
+        account: Optional[str] = None,
+    ) -> tuple[int, list[dict]]:
+        """Newest-first page of capture history plus the total matching row count."""
+        where, args = [], []
+        if account:
+            where.append("account = ?")
+            args.append(account)
+        if date:
+            where.append("date = ?")
+            args.append(date)
+        if status:
+            where.append("status = ?")
+            args.append(status)
+        if job_id:
+            where.append("job_id = ?")
+            args.append(job_id)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with self._lock:
+            self.flush()
+            db = self._db()
+            total = db.execute(f"SELECT COUNT(*) FROM captures {clause}", args).fetchone()[0]
+            rows = db.execute(
+                f"SELECT * FROM captures {clause} ORDER BY id DESC LIMIT ? OFFSET ?",
+                [*args, limit, offset],
+            ).fetchall()
+        return total, [_capture_row(r) for r in rows]
+
+    def captures_version(self) -> int:
+        """Id of the newest capture entry — changes whenever the capture log does
+        (entries are only ever appended)."""
+        with self._lock:
+            self.flush()
+            row = self._db().execute("SELECT MAX(id) FROM captures").fetchone()
+        return row[0] or 0
+
+    def last_checks(self, dates: list[str], account: str = DEFAULT_ACCOUNT) -> dict[str, dict]:
+        """Most recent real check (not a manifest skip) of each date: date → {status, timestamp}."""
+        if not dates:
+            return {}
+        marks = ",".join("?" * len(dates))
+        with self._lock:
+            self.flush()
+            rows = self._db().execute(
+                f"SELECT date, status, timestamp FROM captures WHERE id IN ("
+                f" SELECT MAX(id) FROM captures"
+                f" WHERE status != 'skipped' AND account = ? AND date IN ({marks}) GROUP BY date)",
+                [account, *dates],
+            ).fetchall()
+        return {r["date"]: {"status": r["status"], "timestamp": r["timestamp"]} for r in rows}
+
+    # ── revisions ───────────────────────────────────────────────────────────
+
+    def add_revision(
+        self,
+        date: str,
+        image_hash: str,
+        text_hash: Optional[str],
+        changed: bool,
+        job_id: Optional[str] = None,
+        account: str = DEFAULT_ACCOUNT,
+    ) -> int:
+        """Record one (re)capture of `date`. The revision number only advances when
+        the stored receipt was replaced; returns the current revision."""
+        with self._lock:
+            db = self._db()
+            last = db.execute(
+                "SELECT MAX(revision) FROM revisions WHERE account = ? AND date = ?", (account, date)
+            ).fetchone()[0]
+            revision = (last or 0) + 1 if changed or last is None else last
+            with db:
+                db.execute(
+                    "INSERT INTO revisions"
+                    " (account, date, revision, image_hash, text_hash, changed, job_id, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (account, date, revision, image_hash, text_hash, int(changed), job_id, _now_iso()),
+                )
+        return revision
+
+    def latest_revision(self, date: str, account: str = DEFAULT_ACCOUNT) -> Optional[dict]:
+        """The check that produced the currently stored receipt of `date`."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT * FROM revisions WHERE account = ? AND date = ? ORDER BY revision DESC, id ASC LIMIT 1",
+                (account, date),
+            ).fetchone()
+        return _revision_row(row) if row else None
+
+    def list_revisions(
+        self, date: Optional[str] = None, limit: int = 50, offset: int = 0, account: Optional[str] = None
+    ) -> tuple[int, list[dict]]:
+        where, args = [], []
+        if account:
+            where.append("account = ?")
+            args.append(account)
+        if date:
+            where.append("date = ?")
+            args.append(date)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            db = self._db()
+            total = db.execute(f"SELECT COUNT(*) FROM revisions {clause}", args).fetchone()[0]
+            rows = db.execute(
+                f"SELECT * FROM revisions {clause} ORDER BY id DESC LIMIT ? OFFSET ?",
+                [*args, limit, offset],
+            ).fetchall()
+        return total, [_revision_row(r) for r in rows]
+
+    # ── receipts ────────────────────────────────────────────────────────────
+
+    def replace_receipts(
+        self, date: str, rows: list[dict], job_id: Optional[str] = None, account: str = DEFAULT_ACCOUNT
+    ) -> None:
+        """Store the transaction rows extracted from `date`'s receipt, replacing earlier ones."""
+        captured_at = _now_iso()
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM receipts WHERE account = ? AND date = ?", (account, date))
+                db.executemany(
+                    "INSERT INTO receipts"
+                    " (account, date, seq, passed_at, gate, amount, card, cells, job_id, captured_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            account, date, seq, r["passed_at"], r["gate"], r["amount"], r["card"],
+                            json.dumps(r["cells"], ensure_ascii=False), job_id, captured_at,
+                        )
+                        for seq, r in enumerate(rows)
+                    ],
+                )
+
+    def list_receipts(self, start: str, end: str, account: Optional[str] = None) -> list[dict]:
+        """Transaction rows with start <= date <= end (ISO dates), in passage order.
+        Without `account`, rows of all accounts are returned."""
+        clause, args = _receipts_where(start, end, account)
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT * FROM receipts {clause} ORDER BY date, seq, account", args
+            ).fetchall()
+        return [_receipt_row(r) for r in rows]
+
+    def summarize_receipts(self, start: str, end: str, account: Optional[str] = None) -> dict:
+        """Count and toll totals over [start, end], overall and per day / month / card / account."""
+        clause, args = _receipts_where(start, end, account)
+
+        def grouped(key: str) -> list[dict]:
+            return [
+                {"key": r[0], "count": r[1], "amount": r[2] or 0}
+                for r in db.execute(
+                    f"SELECT {key}, COUNT(*), SUM(amount) FROM receipts {clause} GROUP BY 1 ORDER BY 1", args
+                )
+            ]
+
+        with self._lock:
+            db = self._db()
+            count, amount = db.execute(f"SELECT COUNT(*), SUM(amount) FROM receipts {clause}", args).fetchone()
+            return {
+                "count": count,
+                "total_amount": amount or 0,
+                "by_date": grouped("date"),
+                "by_month": grouped("substr(date, 1, 7)"),
+                "by_card": grouped("card"),
+                "by_account": grouped("account"),
+            }
+
+    # ── backfills ───────────────────────────────────────────────────────────
+
+    def create_backfill(
+        self, backfill_id: str, account: str, start: str, end: str, force: bool, dates: list[str]
+    ) -> dict:
+        """Record a backfill and one pending checkpoint row per date."""
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(
+                    "INSERT INTO backfills (id, account, start_date, end_date, force, state, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, 'running', ?)",
+                    (backfill_id, account, start, end, int(force), _now_iso()),
+                )
+                db.executemany(
+                    "INSERT INTO backfill_dates (backfill_id, date) VALUES (?, ?)",
+                    [(backfill_id, d) for d in dates],
+                )
+        return self.get_backfill(backfill_id)
+
+    def get_backfill(self, backfill_id: str) -> Optional[dict]:
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT * FROM backfills WHERE id = ?", (backfill_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(db.execute(
+                "SELECT status, COUNT(*) FROM backfill_dates WHERE backfill_id = ? GROUP BY status",
+                (backfill_id,),
+            ).fetchall())
+        return _backfill_row(row, counts)
+
+    def list_backfills(self, account: Optional[str] = None, state: Optional[str] = None) -> list[dict]:
+        where, args = [], []
+        if account:
+            where.append("account = ?")
+            args.append(account)
+        if state:
+            where.append("state = ?")
+            args.append(state)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            ids = [r[0] for r in self._db().execute(
+                f"SELECT id FROM backfills {clause} ORDER BY created_at DESC, rowid DESC", args
+            )]
+        return [self.get_backfill(i) for i in ids]
+
+    def set_backfill_state(self, backfill_id: str, state: str) -> None:
+        finished_at = _now_iso() if state == "done" else None
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(
+                    "UPDATE backfills SET state = ?, finished_at = ? WHERE id = ?",
+                    (state, finished_at, backfill_id),
+                )
+
+    def delete_backfill(self, backfill_id: str) -> bool:
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM backfill_dates WHERE backfill_id = ?", (backfill_id,))
+                cur = db.execute("DELETE FROM backfills WHERE id = ?", (backfill_id,))
+        return cur.rowcount > 0
+
+    def next_backfill_dates(self, backfill_id: str, limit: int, max_attempts: int) -> list[str]:
+        """Oldest dates still to do: pending, or failed fewer than `max_attempts` times."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT date FROM backfill_dates WHERE backfill_id = ?"
+                " AND (status = 'pending' OR (status = 'error' AND attempts < ?))"
+                " ORDER BY date LIMIT ?",
+                (backfill_id, max_attempts, limit),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def mark_backfill_dates(self, backfill_id: str, outcomes: dict[str, str], job_id: Optional[str]) -> None:
+        """Checkpoint one chunk: date → 'done' | 'error' (an error counts as an attempt)."""
+        now = _now_iso()
+        with self._lock:
+            db = self._db()
+            with db:
+                db.executemany(
+                    "UPDATE backfill_dates SET status = ?, attempts = attempts + ?, job_id = ?, updated_at = ?"
+                    " WHERE backfill_id = ? AND date = ?",
+                    [
+                        (status, int(status == "error"), job_id, now, backfill_id, d)
+                        for d, status in outcomes.items()
+                    ],
+                )
+
+    def backfill_ranges(self, account: str) -> list[tuple[str, str]]:
+        """Date ranges of the account's backfills — their receipts are exempt from retention."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT start_date, end_date FROM backfills WHERE account = ?", (account,)
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    # ── jobs ────────────────────────────────────────────────────────────────
+
+    def create_job(
+        self, job_id: str, kind: str, total: int, current_date: str = "", account: str = DEFAULT_ACCOUNT
+    ) -> dict:
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(
+                    "INSERT INTO jobs (id, kind, account, total, current_day, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, account, total, current_date, _now_iso()),
+                )
+        return self.get_job(job_id)
+
+    def update_job(self, job_id: str, done: int, current_date: str) -> None:
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute(
+                    "UPDATE jobs SET done = ?, current_day = ? WHERE id = ?",
+                    (done, current_date, job_id),
+                )
+
+    def finish_job(self, job_id: str, timings: Optional[dict] = None) -> None:
+        with self._lock:
+            self.flush()
+            db = self._db()
+            with db:
+                db.execute(
+                    "UPDATE jobs SET finished = 1, finished_at = ?, timings = ? WHERE id = ?",
+                    (_now_iso(), json.dumps(timings) if timings else None, job_id),
+                )
+
+    def finish_stale_jobs(self) -> int:
+        """Mark jobs left running by a previous process as finished; returns how many."""
+        with self._lock:
+            db = self._db()
+            with db:
+                cur = db.execute(
+                    "UPDATE jobs SET finished = 1, finished_at = ? WHERE finished = 0",
+                    (_now_iso(),),
+                )
+        return cur.rowcount
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_row(row) if row else None
+
+    def list_jobs(
+        self, limit: int = 20, offset: int = 0, account: Optional[str] = None
+    ) -> tuple[int, list[dict]]:
+        clause, args = ("WHERE account = ?", [account]) if account else ("", [])
+        with self._lock:
+            db = self._db()
+            total = db.execute(f"SELECT COUNT(*) FROM jobs {clause}", args).fetchone()[0]
+            rows = db.execute(
+                f"SELECT * FROM jobs {clause} ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+                [*args, limit, offset],
+            ).fetchall()
+        return total, [_job_row(r) for r in rows]
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Add columns introduced after a database was first created."""
+    job_columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+    if "timings" not in job_columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN timings TEXT")
+    for table in ("jobs", "captures", "revisions", "receipts"):
+        columns = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if "account" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN account TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}'")
+
+
+def _receipts_where(start: str, end: str, account: Optional[str]) -> tuple[str, list]:
+    if account:
+        return "WHERE account = ? AND date BETWEEN ? AND ?", [account, start, end]
+    return "WHERE date BETWEEN ? AND ?", [start, end]
+
+
+def _capture_row(row: sqlite3.Row) -> dict:
+    entry = {
+        "account": row["account"],
+        "date": row["date"],
+        "status": row["status"],
+        "message": row["message"],
+        "timestamp": row["timestamp"],
+        "job_id": row["job_id"],
+        "duration_ms": row["duration_ms"],
+    }
+    if row["timings"]:
+        entry["timings"] = json.loads(row["timings"])
+    return entry
+
+
+def _revision_row(row: sqlite3.Row) -> dict:
+    return {
+        "account": row["account"],
+        "date": row["date"],
+        "revision": row["revision"],
+        "image_hash": row["image_hash"],
+        "text_hash": row["text_hash"],
+        "changed": bool(row["changed"]),
+        "job_id": row["job_id"],
+        "created_at": row["created_at"],
+    }
+
+
+def _receipt_row(row: sqlite3.Row) -> dict:
+    return {
+        "account": row["account"],
+        "date": row["date"],
+        "passed_at": row["passed_at"],
+        "gate": row["gate"],
+        "amount": row["amount"],
+        "card": row["card"],
+    }
+
+
+def _backfill_row(row: sqlite3.Row, counts: dict[str, int]) -> dict:
+    return {
+        "backfill_id": row["id"],
+        "account": row["account"],
+        "from": row["start_date"],
+        "to": row["end_date"],
+        "force": bool(row["force"]),
+        "state": row["state"],
+        "total": sum(counts.values()),
+        "done": counts.get("done", 0),
+        "error": counts.get("error", 0),
+        "pending": counts.get("pending", 0),
+        "created_at": row["created_at"],
+        "finished_at": row["finished_at"],
+    }
+
+
+def _job_row(row: sqlite3.Row) -> dict:
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "account": row["account"],
+        "total": row["total"],
+        "done": row["done"],
+        "current_date": row["current_day"],
+        "finished": bool(row["finished"]),
+        "created_at": row["created_at"],
+        "finished_at": row["finished_at"],
+        "timings": json.loads(row["timings"]) if row["timings"] else {},
+    }
+
+
+store = Store(_DB_FILE)
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Optional
+
+
+class RateLimiter:
+    """Global pacing for requests to HiPass.
+
+    Every caller awaits acquire() before hitting the site; acquisitions are spaced
+    at least `interval` seconds apart no matter how many workers share the limiter,
+    so adding workers overlaps the browser work without raising the request rate.
+
+    The spacing adapts to how the site responds: slow_down() doubles it (up to
+    `max_interval`) after a failure, speed_up() shrinks it back towards the
+    configured `interval` after each success."""
+
+    def __init__(self, interval: float, max_interval: Optional[float] = None):
+        self.base_interval = interval
+        self.max_interval = max(interval, max_interval or interval)
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    def slow_down(self) -> None:
+        # A zero base interval still needs a non-zero step to back off from
+        self.interval = min(self.max_interval, max(self.interval * 2, self.base_interval, 0.5))
+
+    def speed_up(self) -> None:
+        if self.interval > self.base_interval:
+            self.interval = max(self.base_interval, self.interval * 0.8)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            wait = self._next_at - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = loop.time()
+            self._next_at = now + self.interval
@@ -0,0 +1,99 @@
+"""Circuit breaker regression check: open → cooldown → a job gets through.
+
+Drives the scraper's real login and capture loops (_open_session_with_retry,
+_capture_one) with the browser steps replaced by stand-ins, against a breaker that
+has just opened, and fails if any scenario hangs:
+
+- plain: the job waits out the cooldown, logs in (taking the half-open probe) and
+  captures a date
+- session loss: the first lookup bounces to the login page while the probe is out;
+  the re-login and the retried lookup must still go through
+- rejected login: the probe is handed back, so the next job can probe
+
+No browser or network needed:
+
+    python -m bench.breaker_check
+"""
+import asyncio
+import os
+import tempfile
+from datetime import date, timedelta
+
+_TIMEOUT = 10.0
+
+
+async def _scenario(name: str, scraper, resilience, *, lose_session: bool = False, reject_login: bool = False):
+    from app import accounts
+
+    resilience.breaker = resilience.CircuitBreaker(1, 0.2)
+    resilience.breaker.record_failure()
+    assert resilience.breaker.state == "open"
+
+    calls = {"login": 0, "lookup": 0}
+
+    async def open_session(page, account):
+        calls["login"] += 1
+        if reject_login:
+            raise resilience.LoginRejected("아이디 또는 비밀번호 오류")
+
+    async def capture_date(page, target_date, output_dir, timings=None, receipt=None):
+        calls["lookup"] += 1
+        if lose_session and calls["lookup"] == 1:
+            raise resilience.SessionExpired("조회 중 로그인 페이지로 이동됨")
+        return None  # no transactions that day
+
+    async def no_op(*args, **kwargs):
+        return False
+
+    scraper.open_session = open_session
+    scraper.capture_date = capture_date
+    scraper._is_logged_out = no_op
+    scraper.navigate_to_lookup = no_op
+    scraper._discard_session = lambda account: None
+
+    account = accounts.get()
+    page = object()
+
+    async def job():
+        await resilience.breaker.wait(probe=False)  # job level, as in _capture_dates
+        await scraper._open_session_with_retry(page, account)
+        session = scraper._Session(account)
+        return await scraper._capture_one(page, date.today() - timedelta(days=1), session)
+
+    try:
+        entry = await asyncio.wait_for(job(), _TIMEOUT)
+    except resilience.LoginRejected:
+        # The next caller must be able to probe instead of waiting forever
+        token = await asyncio.wait_for(resilience.breaker.wait(), _TIMEOUT)
+        assert token is not None, "probe not handed back after a rejected login"
+        print(f"[check] {name}: ok (probe released, state={resilience.breaker.state})")
+        return
+    except asyncio.TimeoutError:
+        raise SystemExit(f"[check] {name}: job hung behind the breaker ({calls})")
+    assert entry["status"] == "empty", entry
+    assert resilience.breaker.state == "closed", resilience.breaker.state
+    print(f"[check] {name}: ok ({calls['login']} login(s), {calls['lookup']} lookup(s), {entry['status']})")
+
+
+async def run() -> None:
+    from app import resilience, scraper
+
+    await _scenario("plain", scraper, resilience)
+    await _scenario("session loss", scraper, resilience, lose_session=True)
+    await _scenario("rejected login", scraper, resilience, reject_login=True)
+
+
+def main() -> None:
+    os.environ.update({
+        "SCREENSHOTS_DIR": tempfile.mkdtemp(prefix="hipass-breaker-"),
+        "HIPASS_ID": "bench",
+        "HIPASS_PW": "bench",
+        "CAPTURE_COOLDOWN": "0",
+        "RETRY_BASE_DELAY": "0.01",
+        "MANIFEST_WATCH": "false",
+    })
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
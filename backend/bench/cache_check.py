@@ -0,0 +1,120 @@
+"""Bytes transferred by a first and a repeat page load.
+
+Writes a few synthetic receipts into a temporary SCREENSHOTS_DIR, then loads the
+page the way the browser does — the HTML, /api/screenshots, /api/logs, the
+stylesheet, every thumbnail and receipt — first with an empty cache and then again
+revalidating with the ETags from the first load; URLs served as immutable are
+not requested again, as in a browser. Reports wire bytes (after gzip) and status
+codes per resource. The repeat load should be all 304s or cache hits and close to
+zero bytes; the exit status is 1 if it is not. No browser or network needed:
+
+    python -m bench.cache_check --days 14
+    python -m bench.cache_check --json cache.txt
+
+Do not run inside the production container: app.config prefers /app/.env over
+the environment variables set here.
+"""
+import argparse
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+
+def _write_receipts(directory: str, days: int) -> None:
+    from PIL import Image, ImageDraw
+
+    from app.manifest import receipt_filename
+
+    for i in range(1, days + 1):
+        day = (date.today() - timedelta(days=i)).isoformat()
+        im = Image.new("RGB", (600, 900), "white")
+        ImageDraw.Draw(im).text((20, 20), f"receipt {day}", fill="black")
+        im.save(os.path.join(directory, receipt_filename(day)), "PNG")
+
+
+def _load(client, urls: list[str], cache: dict[str, str], immutable: set[str]) -> dict:
+    """GET every url (revalidating with `cache` ETags) and record what crossed the wire.
+    Like a browser, URLs last served as immutable are not requested again."""
+    resources = {}
+    for url in urls:
+        if url in immutable:
+            resources[url] = {"status": "cached", "bytes": 0}
+            continue
+        headers = {"Accept-Encoding": "gzip"}
+        if url in cache:
+            headers["If-None-Match"] = cache[url]
+        r = client.get(url, headers=headers)
+        if "etag" in r.headers:
+            cache[url] = r.headers["etag"]
+        if "immutable" in r.headers.get("cache-control", ""):
+            immutable.add(url)
+        resources[url] = {
+            "status": r.status_code,
+            "bytes": r.num_bytes_downloaded,
+            "encoding": r.headers.get("content-encoding"),
+            "cache_control": r.headers.get("cache-control"),
+        }
+    return {"bytes": sum(v["bytes"] for v in resources.values()), "resources": resources}
+
+
+def run(args: argparse.Namespace) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    cache: dict[str, str] = {}
+    immutable: set[str] = set()
+    with TestClient(app) as client:
+        listing = client.get("/api/screenshots").json()
+        urls = ["/", "/api/screenshots", "/api/logs", "/static/style.css"]
+        for item in listing:
+            if item["exists"]:
+                urls.append(f"/thumbnails/{item['date']}?v={item['mtime']}")
+                urls.append(item["webp_url"] or item["url"])
+        first = _load(client, urls, cache, immutable)
+        repeat = _load(client, urls, cache, immutable)
+
+    not_revalidated = [u for u, v in repeat["resources"].items() if v["status"] not in (304, "cached")]
+    return {
+        "days": args.days,
+        "resources": len(urls),
+        "cached_without_request": len(immutable),
+        "first_load_bytes": first["bytes"],
+        "repeat_load_bytes": repeat["bytes"],
+        "not_revalidated": not_revalidated,
+        "first_load": first["resources"] if args.verbose else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--verbose", action="store_true", help="include per-resource details of the first load")
+    parser.add_argument("--json", metavar="FILE", help="also write the report to FILE")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="hipass-cache-")
+    os.environ.update({
+        "SCREENSHOTS_DIR": workdir,
+        "HIPASS_ID": "bench",
+        "HIPASS_PW": "bench",
+        "MANIFEST_WATCH": "false",
+        "BROWSER_WARMUP": "false",
+        "RETENTION_DAYS": str(max(args.days + 1, 14)),
+    })
+    _write_receipts(workdir, args.days)
+
+    report = run(args)
+    report["screenshots_dir"] = workdir
+    text = json.dumps({k: v for k, v in report.items() if v is not None}, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if report["not_revalidated"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
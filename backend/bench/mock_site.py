@@ -0,0 +1,214 @@
+"""Local stand-in for the parts of hipass.co.kr the scraper touches.
+
+Serves the login page, the InitUsePculrTabSearch.do lookup form, the if_main_post
+result iframe with #billAll, the no-data alert and the .popup_content receipt popup.
+A promotional video on the lookup page gives the resource blocker something to
+abort. Latency, error rate and the share of empty days are configurable, and which days
+are empty is a deterministic function of the date and seed, so runs are comparable.
+
+Standalone:  python -m bench.mock_site --port 8765 --latency-ms 300
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from datetime import date, timedelta
+
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+
+_SESSION_COOKIE = "MOCK_JSESSIONID"
+
+_STYLE = """
+<style>
+  body { font-family: sans-serif; margin: 0; }
+  .popup_content { width: 640px; padding: 24px; background: #fff; }
+  .popup_content h2 { margin: 0 0 12px; font-size: 20px; }
+  table { border-collapse: collapse; width: 100%; }
+  th, td { border: 1px solid #999; padding: 6px 8px; font-size: 13px; }
+  th { background: #eef; }
+</style>
+"""
+
+# Opaque filler, not a playable video; only its transfer size matters
+_PROMO_VIDEO = bytes(range(256)) * 2048  # 512 KB
+
+_TOLL_GATES = ["서울", "판교", "수원신갈", "기흥", "동탄", "오산", "안성", "천안", "남이천", "대전"]
+
+
+def _day_seed(day: date, seed: int) -> int:
+    return int(hashlib.sha256(f"{seed}:{day.isoformat()}".encode()).hexdigest()[:8], 16)
+
+
+def _transactions(day: date, seed: int, empty_rate: float) -> list[dict]:
+    """Deterministic fake transactions for one day; [] for an empty day."""
+    rng = random.Random(_day_seed(day, seed))
+    if rng.random() < empty_rate:
+        return []
+    rows = []
+    for _ in range(rng.randint(1, 4)):
+        rows.append({
+            "time": f"{day.isoformat()} {rng.randint(6, 22):02d}:{rng.randint(0, 59):02d}",
+            "gate": rng.choice(_TOLL_GATES),
+            "amount": rng.choice([900, 1300, 1800, 2400, 3100, 4700]),
+            "card": "1234-56**-****-7890",
+        })
+    return sorted(rows, key=lambda r: r["time"])
+
+
+def _parse_day(value: str) -> date:
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def create_app(
+    latency_ms: int = 300,
+    error_rate: float = 0.0,
+    empty_rate: float = 0.3,
+    seed: int = 1,
+) -> FastAPI:
+    app = FastAPI(title="HiPass mock")
+    rng = random.Random(seed)
+
+    async def delay() -> None:
+        if latency_ms > 0:
+            # ±30% jitter around the configured latency
+            await asyncio.sleep(latency_ms / 1000 * rng.uniform(0.7, 1.3))
+
+    def logged_in(request: Request) -> bool:
+        return request.cookies.get(_SESSION_COOKIE) == "ok"
+
+    @app.get("/comm/lginpg.do", response_class=HTMLResponse)
+    async def login_page():
+        await delay()
+        return f"""<html><head>{_STYLE}</head><body>
+<form id="loginForm" method="post" action="/comm/login.do">
+  <input id="per_user_id" name="user_id" type="text" />
+  <input id="per_passwd" name="passwd" type="password" />
+  <button id="per_login" type="submit">로그인</button>
+</form>
+</body></html>"""
+
+    @app.post("/comm/login.do")
+    async def do_login(user_id: str = Form(""), passwd: str = Form("")):
+        await delay()
+        if not user_id or not passwd:
+            return RedirectResponse("/comm/lginpg.do?error=1", status_code=303)
+        response = RedirectResponse("/main.do", status_code=303)
+        response.set_cookie(_SESSION_COOKIE, "ok", httponly=True)
+        return response
+
+    @app.get("/main.do", response_class=HTMLResponse)
+    async def main_page():
+        return "<html><body><h1>mock main</h1></body></html>"
+
+    @app.get("/usepculr/InitUsePculrTabSearch.do")
+    async def lookup_page(request: Request):
+        await delay()
+        if not logged_in(request):
+            return RedirectResponse("/comm/lginpg.do", status_code=302)
+        return HTMLResponse(f"""<html><head>{_STYLE}</head><body>
+<select id="ecd_no"><option value="">전체</option><option value="0001">0001</option></select>
+<input id="sDate_view" type="text" /> ~ <input id="eDate_view" type="text" />
+<input id="sDate" type="hidden" /><input id="eDate" type="hidden" />
+<div id="lookupBtn"><a href="#" onclick="lookup(); return false;">조회</a></div>
+<video src="/static/promo.mp4" autoplay muted loop width="320"></video>
+<iframe name="if_main_post" src="/usepculr/blank.do" width="900" height="600"></iframe>
+<script>
+function lookup() {{
+  const s = document.getElementById('sDate').value;
+  const e = document.getElementById('eDate').value;
+  window.frames['if_main_post'].location.href =
+    '/usepculr/UsePculrList.do?sDate=' + s + '&eDate=' + e + '&t=' + Date.now();
+}}
+</script>
+</body></html>""")
+
+    @app.get("/static/promo.mp4")
+    async def promo_video():
+        # Stand-in for the site's promotional media — the resource blocker should abort it
+        return Response(_PROMO_VIDEO, media_type="video/mp4")
+
+    @app.get("/usepculr/blank.do", response_class=HTMLResponse)
+    async def blank():
+        return "<html><body></body></html>"
+
+    @app.get("/usepculr/UsePculrList.do")
+    async def result_list(request: Request, sDate: str, eDate: str):
+        await delay()
+        if not logged_in(request):
+            return RedirectResponse("/comm/lginpg.do", status_code=302)
+        if rng.random() < error_rate:
+            return Response("<html><body>일시적인 오류</body></html>", status_code=500, media_type="text/html")
+
+        start, end = _parse_day(sDate), _parse_day(eDate)
+        rows = []
+        day = start
+        while day <= end:
+            rows.extend(_transactions(day, seed, empty_rate))
+            day += timedelta(days=1)
+
+        body = "".join(
+            f"<tr><td>{r['time']}</td><td>{r['gate']}</td><td>{r['amount']:,}</td><td>{r['card']}</td></tr>"
+            for r in rows
+        ) or '<tr><td colspan="4">조회된 내역이 없습니다.</td></tr>'
+        return HTMLResponse(f"""<html><head>{_STYLE}</head><body>
+<table><thead><tr><th>통행일시</th><th>영업소</th><th>통행요금</th><th>카드번호</th></tr></thead>
+<tbody>{body}</tbody></table>
+<a id="billAll" href="#" onclick="printAll(); return false;">영수증 일괄출력</a>
+<script>
+function printAll() {{
+  if ({len(rows)} === 0) {{ alert('출력할 영수증 데이터가 없습니다.'); return; }}
+  if (confirm('영수증을 출력하시겠습니까?')) {{
+    window.open('/usepculr/receipt.do?sDate={sDate}&eDate={eDate}', 'receipt', 'width=720,height=900');
+  }}
+}}
+</script>
+</body></html>""")
+
+    @app.get("/usepculr/receipt.do")
+    async def receipt(request: Request, sDate: str, eDate: str):
+        await delay()
+        if not logged_in(request):
+            return RedirectResponse("/comm/lginpg.do", status_code=302)
+        start, end = _parse_day(sDate), _parse_day(eDate)
+        rows = []
+        day = start
+        while day <= end:
+            rows.extend(_transactions(day, seed, empty_rate))
+            day += timedelta(days=1)
+        body = "".join(
+            f"<tr><td>{r['time']}</td><td>{r['gate']}</td><td>{r['amount']:,}원</td><td>{r['card']}</td></tr>"
+            for r in rows
+        )
+        total = sum(r["amount"] for r in rows)
+        return HTMLResponse(f"""<html><head>{_STYLE}</head><body>
+<div class="popup_content">
+  <h2>통행료 영수증</h2>
+  <table><thead><tr><th>통행일시</th><th>영업소</th><th>통행요금</th><th>카드번호</th></tr></thead>
+  <tbody>{body}</tbody>
+  <tfoot><tr><th colspan="2">합계</th><td colspan="2">{total:,}원</td></tr></tfoot></table>
+</div>
+</body></html>""")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--empty-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency_ms, args.error_rate, args.empty_rate, args.seed),
+        host="127.0.0.1",
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Capture time and file size of the receipt per rendering setting.
+
+Runs bench.run_bench once per setting, each in its own process, against the local
+mock site. The settings are RENDER_* environment overrides. For each one it
+reports the mean screenshot and render stage times, per-date p50, the mean
+PNG size and pixel size of the saved receipts, and the mean WebP size when those
+PNGs are re-encoded at each --webp-quality. Open the listed screenshots_dir to
+check the receipts are still legible before picking the cheapest setting.
+
+Run from backend/ (needs `playwright install chromium`):
+
+    python -m bench.render_bench --days 10
+    python -m bench.render_bench --set "wide:RENDER_POPUP_WIDTH=1280,RENDER_CLIP=true"
+    python -m bench.render_bench --webp-quality 60,80,lossless --json render.txt
+
+Do not run inside the production container: app.config prefers /app/.env over
+the environment variables set here.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# name → RENDER_* overrides; baseline is the shipped default
+_PRESETS: dict[str, dict[str, str]] = {
+    "baseline": {},
+    "clip": {"RENDER_CLIP": "true"},
+    "popup-800": {"RENDER_POPUP_WIDTH": "800", "RENDER_CLIP": "true"},
+    "scale-1.5": {"RENDER_DEVICE_SCALE": "1.5"},
+    "scale-2": {"RENDER_DEVICE_SCALE": "2"},
+    "animations-allowed": {"RENDER_DISABLE_ANIMATIONS": "false"},
+}
+
+
+def _parse_setting(text: str) -> tuple[str, dict[str, str]]:
+    name, _, assignments = text.partition(":")
+    overrides = {}
+    for item in filter(None, assignments.split(",")):
+        key, _, value = item.partition("=")
+        overrides[key.strip()] = value.strip()
+    return name, overrides
+
+
+def _webp_size(path: Path, quality: str) -> int:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    with Image.open(path) as im:
+        if quality == "lossless":
+            im.save(buf, "WEBP", lossless=True, quality=80, method=4)
+        else:
+            im.save(buf, "WEBP", quality=int(quality), method=4)
+    return buf.tell()
+
+
+def _receipt_stats(directory: Path, qualities: list[str]) -> dict:
+    from PIL import Image
+
+    pngs = sorted(p for p in directory.glob("*.png"))
+    if not pngs:
+        return {"receipts": 0}
+    sizes = []
+    for path in pngs:
+        with Image.open(path) as im:
+            sizes.append(im.size)
+    return {
+        "receipts": len(pngs),
+        "png_kb": round(statistics.mean(p.stat().st_size for p in pngs) / 1024, 1),
+        "pixels": f"{round(statistics.mean(w for w, _ in sizes))}x{round(statistics.mean(h for _, h in sizes))}",
+        "webp_kb": {
+            q: round(statistics.mean(_webp_size(p, q) for p in pngs) / 1024, 1) for q in qualities
+        },
+    }
+
+
+def _run_setting(name: str, overrides: dict[str, str], args: argparse.Namespace) -> dict:
+    report_file = Path(tempfile.mkstemp(prefix=f"render-{name}-", suffix=".json")[1])
+    env = dict(os.environ)
+    env.update(overrides)
+    # Keep the saved PNG as rendered, so the sizes compare the settings themselves
+    env.update({"IMAGE_OPTIMIZE_PNG": "false", "IMAGE_WEBP": "false"})
+    subprocess.run(
+        [sys.executable, "-m", "bench.run_bench", "--days", str(args.days),
+         "--latency-ms", str(args.latency_ms), "--empty-rate", "0", "--concurrency", "1",
+         "--port", str(args.port), "--json", str(report_file)],
+        env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    bench = json.loads(report_file.read_text(encoding="utf-8"))
+    report_file.unlink()
+    stages = bench["stage_mean_ms"]
+    return {
+        "overrides": overrides,
+        "screenshot_ms": stages.get("screenshot"),
+        "render_ms": stages.get("render"),
+        "per_date_p50_ms": bench["per_date_p50_ms"],
+        **_receipt_stats(Path(bench["screenshots_dir"]), args.webp_quality),
+        "screenshots_dir": bench["screenshots_dir"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME:KEY=VAL,...",
+                        help="extra setting to compare (repeatable); replaces the presets when given")
+    parser.add_argument("--webp-quality", default="70,85,lossless",
+                        type=lambda v: [q.strip() for q in v.split(",") if q.strip()])
+    parser.add_argument("--json", metavar="FILE", help="also write the report to FILE")
+    args = parser.parse_args()
+
+    settings = dict(_parse_setting(s) for s in args.set) if args.set else _PRESETS
+    report = {name: _run_setting(name, overrides, args) for name, overrides in settings.items()}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""End-to-end scraper benchmark against the local mock site.
+
+Starts bench.mock_site in-process, points the scraper at it through
+HIPASS_BASE_URL, runs capture_last_n_days into a temporary SCREENSHOTS_DIR and
+reports dates/minute, p50/p95 per-date latency and peak RSS of the process tree
+(python + playwright driver + Chromium).
+
+Run from backend/ (needs `playwright install chromium`):
+
+    python -m bench.run_bench --days 14 --latency-ms 300 --concurrency 2
+    python -m bench.run_bench --days 30 --range-mode --json bench_output.txt
+    python -m bench.run_bench --days 14 --no-block   # compare transferred bytes
+    python -m bench.run_bench --days 14 --fast-path  # HTTP lookups, browser only for receipts
+
+Do not run inside the production container: app.config prefers /app/.env over
+the environment variables set here.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def _counter_totals(counter, label: str) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for metric in counter.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                key = sample.labels[label]
+                totals[key] = totals.get(key, 0) + sample.value
+    return totals
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _sample_rss(stop: asyncio.Event, peak: list[float]) -> None:
+    from app.metrics import process_tree_rss_mb
+
+    while not stop.is_set():
+        peak[0] = max(peak[0], process_tree_rss_mb())
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import uvicorn
+
+    from bench.mock_site import create_app
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(args.latency_ms, args.error_rate, args.empty_rate, args.seed),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    # Imported only now: app.config reads the environment prepared in main()
+    from app import browser, metrics, scraper
+    from app.loopmon import monitor
+    from app.store import store
+
+    stop = asyncio.Event()
+    peak = [0.0]
+    sampler = asyncio.create_task(_sample_rss(stop, peak))
+    monitor.start()
+
+    started = time.perf_counter()
+    entries = await scraper.capture_last_n_days(n=args.days, job_id="bench")
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+    await monitor.stop()
+    await browser.pool.stop()
+    store.close()
+    server.should_exit = True
+    await server_task
+
+    durations = [e["duration_ms"] for e in entries if e.get("duration_ms") is not None]
+    by_status: dict[str, int] = {}
+    for e in entries:
+        by_status[e["status"]] = by_status.get(e["status"], 0) + 1
+    stages: dict[str, list[int]] = {}
+    for e in entries:
+        for stage, ms in (e.get("timings") or {}).items():
+            stages.setdefault(stage, []).append(ms)
+
+    return {
+        "days": args.days,
+        "concurrency": args.concurrency,
+        "range_mode": args.range_mode,
+        "fast_path": args.fast_path,
+        "fast_lookups": {k: int(v) for k, v in _counter_totals(metrics.FAST_LOOKUPS, "outcome").items()},
+        "latency_ms": args.latency_ms,
+        "elapsed_s": round(elapsed, 2),
+        "dates_per_min": round(args.days / elapsed * 60, 1) if elapsed else 0.0,
+        "per_date_p50_ms": _percentile(durations, 50),
+        "per_date_p95_ms": _percentile(durations, 95),
+        "stage_mean_ms": {k: round(statistics.mean(v)) for k, v in sorted(stages.items())},
+        "peak_rss_mb": round(peak[0], 1),
+        "loop_lag": monitor.snapshot(),
+        "block_resources": not args.no_block,
+        "blocked_requests": {k: int(v) for k, v in _counter_totals(metrics.BLOCKED_REQUESTS, "resource_type").items()},
+        "transferred_kb": {
+            k: round(v / 1024, 1) for k, v in _counter_totals(metrics.TRANSFERRED_BYTES, "resource_type").items()
+        },
+        "outcomes": by_status,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--range-mode", action="store_true")
+    parser.add_argument("--fast-path", action="store_true", help="run with HTTP_FAST_PATH=true")
+    parser.add_argument("--no-block", action="store_true", help="run with BLOCK_RESOURCES=false")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="CAPTURE_COOLDOWN for the run")
+    parser.add_argument("--latency-ms", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--empty-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", metavar="FILE", help="also write the report to FILE")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="hipass-bench-")
+    os.environ.update({
+        "HIPASS_BASE_URL": f"http://127.0.0.1:{args.port}",
+        "HIPASS_ID": "bench",
+        "HIPASS_PW": "bench",
+        "ECD_NO": "",
+        "SCREENSHOTS_DIR": workdir,
+        "CAPTURE_COOLDOWN": str(args.cooldown),
+        "CAPTURE_CONCURRENCY": str(args.concurrency),
+        "CAPTURE_RANGE_MODE": "true" if args.range_mode else "false",
+        "HTTP_FAST_PATH": "true" if args.fast_path else "false",
+        "MANIFEST_WATCH": "false",
+        "BLOCK_RESOURCES": "false" if args.no_block else "true",
+        # The mock site is first-party here, as hipass.co.kr is in production
+        "BLOCK_ALLOW_DOMAINS": "127.0.0.1",
+        # Sampled more often than in production: a run is short. The mock site shares
+        # the loop, so its own handlers count towards the lag as well.
+        "LOOP_LAG_INTERVAL": "0.1",
+    })
+
+    report = asyncio.run(run(args))
+    report["screenshots_dir"] = workdir
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold-start time and idle memory of the service.
+
+Each run starts a fresh Python process that imports app.main, runs the FastAPI
+lifespan startup and then waits, reporting:
+
+- import_s / startup_s: time to import app.main and to finish the lifespan startup
+- rss_mb: process tree RSS (python + playwright driver + Chromium) after import,
+  after startup, once the browser warm-up finished and after the idle shutdown
+- which heavy modules (playwright, PIL, app.scraper) were loaded at startup
+
+The report holds the median over --runs cold starts. Compare against the
+container's 1 GB limit and between releases. Run from backend/:
+
+    python -m bench.startup_profile --runs 5
+    python -m bench.startup_profile --warmup --idle 5   # needs `playwright install chromium`
+    python -m bench.startup_profile --json startup.txt
+
+Do not run inside the production container: app.config prefers /app/.env over
+the environment variables set here.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_HEAVY_MODULES = ("playwright", "PIL.Image", "app.scraper")
+
+
+async def _child(args: argparse.Namespace) -> dict:
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    from app import browser
+    from app.metrics import process_tree_rss_mb
+
+    report = {
+        "import_s": round(imported - started, 3),
+        "rss_mb": {"imported": round(process_tree_rss_mb(), 1)},
+    }
+    async with app.router.lifespan_context(app):
+        report["startup_s"] = round(time.perf_counter() - imported, 3)
+        report["rss_mb"]["started"] = round(process_tree_rss_mb(), 1)
+        report["loaded_at_startup"] = [m for m in _HEAVY_MODULES if m in sys.modules]
+
+        if args.warmup:
+            deadline = time.perf_counter() + 60
+            while not browser.pool.running and time.perf_counter() < deadline:
+                await asyncio.sleep(0.1)
+            report["warm_s"] = round(time.perf_counter() - imported, 3) if browser.pool.running else None
+            report["rss_mb"]["warm"] = round(process_tree_rss_mb(), 1)
+            if args.idle > 0:
+                await asyncio.sleep(args.idle + 1)
+                report["rss_mb"]["idle"] = round(process_tree_rss_mb(), 1)
+                report["browser_running_after_idle"] = browser.pool.running
+    return report
+
+
+def _run_once(args: argparse.Namespace) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "SCREENSHOTS_DIR": tempfile.mkdtemp(prefix="hipass-startup-"),
+        "HIPASS_ID": "bench",
+        "HIPASS_PW": "bench",
+        "MANIFEST_WATCH": "false",
+        "BROWSER_WARMUP": "true" if args.warmup else "false",
+        "BROWSER_IDLE_SECONDS": str(args.idle),
+    })
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.startup_profile", "--child",
+         *(["--warmup"] if args.warmup else []), "--idle", str(args.idle)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    # The app prints its own log lines; the report is the last line
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _median(values: list) -> float:
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warmup", action="store_true", help="run with BROWSER_WARMUP=true and wait for it")
+    parser.add_argument("--idle", type=float, default=0.0,
+                        help="BROWSER_IDLE_SECONDS; with --warmup also measures RSS after the idle shutdown")
+    parser.add_argument("--json", metavar="FILE", help="also write the report to FILE")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_child(args))))
+        return
+
+    runs = [_run_once(args) for _ in range(max(1, args.runs))]
+    stages = sorted({k for r in runs for k in r["rss_mb"]})
+    report = {
+        "runs": len(runs),
+        "warmup": args.warmup,
+        "idle_seconds": args.idle,
+        "import_s": _median([r["import_s"] for r in runs]),
+        "startup_s": _median([r["startup_s"] for r in runs]),
+        "rss_mb": {k: _median([r["rss_mb"].get(k) for r in runs]) for k in stages},
+        "loaded_at_startup": runs[-1]["loaded_at_startup"],
+    }
+    if args.warmup:
+        report["warm_s"] = _median([r.get("warm_s") for r in runs])
+        if args.idle > 0:
+            report["browser_running_after_idle"] = runs[-1].get("browser_running_after_idle")
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()